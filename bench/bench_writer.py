@@ -0,0 +1,152 @@
+"""So sánh cách ghi report cũ (ô theo chuỗi toạ độ, VIE ghi lượt thứ hai, lưu BytesIO) và ReportWorkbook.
+
+    python -m bench.bench_writer --records 2000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from io import BytesIO
+
+from openpyxl import load_workbook
+
+from bench.synthetic import _WORDS, make_template
+from report_writer import (LEGACY_DATE_FORMAT, REPORT_COLUMNS, START_ROW, ReportWorkbook, row_values,
+                           write_report)
+
+
+def legacy_write(template, details, translations):
+    """Cách ghi trước đây: ws[f'A{row}'] cho ENG, rồi iter_rows + vie_ws[cell.coordinate] cho VIE."""
+    wb = load_workbook(BytesIO(template))
+    ws = wb["ENG"]
+    for i, record in enumerate(details):
+        row = START_ROW + i
+        for letter, value in zip("ABCDEFGH", row_values(record)):
+            ws[f'{letter}{row}'] = value
+        if isinstance(ws[f'B{row}'].value, datetime):
+            ws[f'B{row}'].number_format = "dd-mmm-yyyy"
+
+    vie_ws = wb["VIE"]
+    for row in ws.iter_rows(min_row=START_ROW, max_row=START_ROW + len(details) - 1):
+        for cell in row:
+            value = cell.value
+            vie_ws[cell.coordinate] = translations.get(value, value) if isinstance(value, str) else value
+            if isinstance(value, datetime):
+                vie_ws[cell.coordinate].number_format = "dd-mmm-yyyy"
+
+    output = BytesIO()
+    wb.save(output)
+    output.seek(0)
+    return output
+
+
+def synthetic_details(records, seed=42):
+    """Record giống normalize_project trả về, kèm dict dịch ENG -> VIE cho mọi chuỗi."""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    details = []
+    for i in range(records):
+        details.append(dict(zip(REPORT_COLUMNS, (
+            str(100000 + i),
+            start + timedelta(days=rng.randrange(365)),
+            " ".join(rng.choices(_WORDS, k=6)),
+            f"Leader {rng.randrange(40)}",
+            f"{rng.randint(1, 7)} months",
+            " ".join(rng.choices(_WORDS, k=40)),
+            "\n".join(f"KPI {k}: {rng.randint(50, 100)} -> {rng.randint(80, 120)}" for k in range(3)),
+            2024,
+        ))))
+    translations = {value: f"[vi] {value}" for record in details
+                    for value in row_values(record) if isinstance(value, str)}
+    return details, translations
+
+
+def _measure(fn, repeat):
+    """Thời gian tốt nhất sau repeat lần, rồi chạy thêm một lần dưới tracemalloc để lấy peak heap."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak / (1024 * 1024), result
+
+
+def _fill_and_save(template, details, translations):
+    report = ReportWorkbook(template)
+    start = time.perf_counter()
+    report.extend(details, translations)
+    filled = time.perf_counter()
+    report.save()
+    return filled - start, time.perf_counter() - filled
+
+
+def legacy_update_stats(template, details, translations):
+    """Cập nhật report do bản cũ tạo (không có sheet meta, ngày là chuỗi) bằng chính các record đó.
+
+    Record fetch lại có thêm giờ trong ngày như closedDate thật; không dòng nào được bị thay.
+    """
+    wb = load_workbook(BytesIO(template))
+    ws = wb["ENG"]
+    for i, record in enumerate(details):
+        values = row_values(record)
+        values[1] = values[1].strftime(LEGACY_DATE_FORMAT)
+        for column, value in enumerate(values, start=1):
+            ws.cell(row=START_ROW + i, column=column).value = value
+    legacy = BytesIO()
+    wb.save(legacy)
+
+    date_key = REPORT_COLUMNS[1]
+    report = ReportWorkbook(legacy.getvalue(), update=True)
+    for record in details:
+        report.upsert({**record, date_key: record[date_key] + timedelta(hours=8, minutes=30)}, translations)
+    return report.stats
+
+
+def _size(output):
+    output.seek(0, os.SEEK_END)
+    return output.tell()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench.bench_writer", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        with open(make_template(os.path.join(workdir, "template.xlsx")), "rb") as f:
+            template = f.read()
+    details, translations = synthetic_details(args.records)
+
+    legacy_s, legacy_mb, legacy_out = _measure(lambda: legacy_write(template, details, translations), args.repeat)
+    new_s, new_mb, new_out = _measure(lambda: write_report(template, details, translations), args.repeat)
+
+    # Hai cách phải cho cùng nội dung ô trên cả ENG và VIE
+    a, b = load_workbook(legacy_out, read_only=True), load_workbook(new_out, read_only=True)
+    same = all(list(a[name].values) == list(b[name].values) for name in ("ENG", "VIE"))
+
+    print(f"{args.records} records (ENG + VIE), best of {args.repeat}")
+    print(f"  legacy:         {legacy_s * 1000:10.1f} ms  peak heap {legacy_mb:7.1f} MB  "
+          f"file {_size(legacy_out) / 1024:.0f} KiB in memory")
+    print(f"  ReportWorkbook: {new_s * 1000:10.1f} ms  peak heap {new_mb:7.1f} MB  "
+          f"file {_size(new_out) / 1024:.0f} KiB in temp file  x{legacy_s / new_s:.2f}")
+    fill_s, save_s = _fill_and_save(template, details, translations)
+    print(f"  ReportWorkbook fill {fill_s * 1000:.1f} ms, save {save_s * 1000:.1f} ms")
+    print(f"  identical cells: {same}")
+    stats = legacy_update_stats(template, details, translations)
+    print(f"  legacy report update: {stats['replaced']} replaced, {stats['unchanged']} unchanged")
+    return 0 if same and stats["replaced"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
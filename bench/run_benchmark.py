@@ -0,0 +1,173 @@
+"""Benchmark tạo report offline: Master Data giả, server ekaizen giả và translator giả.
+
+    python -m bench.run_benchmark --rows 50000 --latency 0.08 --translate-delay 0.2
+    python -m bench.run_benchmark --mode phased --json phased.json
+
+Kết quả gồm thời gian end-to-end, tổng thời gian từng stage, peak memory và số request đã gửi.
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from bench.stub_server import StubEkaizenServer
+from bench.synthetic import make_master_workbook, make_template
+from ekaizen_client import EkaizenClient
+from instrumentation import Tracer
+from normalize import PROJECT_FIELDS
+from master_data import PeriodIndex, month_range
+from report_core import (build_reports, fetch_records, generate_reports, load_master,
+                         select_projects, translate_reports, write_reports)
+from translation import StubBackend, TranslationService
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux trả về KB, macOS trả về byte
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def prepare_inputs(workdir, rows, seed):
+    """Sinh (hoặc dùng lại) file Master Data và template trong workdir."""
+    os.makedirs(workdir, exist_ok=True)
+    master_path = os.path.join(workdir, f"master_{rows}_{seed}.xlsx")
+    template_path = os.path.join(workdir, "template.xlsx")
+    if not os.path.exists(master_path):
+        make_master_workbook(master_path, rows=rows, seed=seed)
+    if not os.path.exists(template_path):
+        make_template(template_path)
+    with open(master_path, "rb") as f:
+        master = f.read()
+    with open(template_path, "rb") as f:
+        template = f.read()
+    return master, template
+
+
+def _run_phased(master, template, periods, client, translator, min_saving, engine, tracer):
+    """Cách chạy tuần tự từng pha (fetch hết rồi mới dịch, rồi mới ghi) để so sánh."""
+    df, col_names = load_master(master, engine=engine, tracer=tracer)
+    project_ids, period_project_ids = select_projects(df, col_names, PeriodIndex(df, col_names),
+                                                      periods, min_saving, tracer=tracer)
+    with tracer.span("fetch_phase"):
+        records = fetch_records(project_ids, client)
+    reports = build_reports(records, period_project_ids)
+    with tracer.span("translate_phase"):
+        translations = translate_reports(reports, translator)
+    with tracer.span("write_phase"):
+        return write_reports(template, reports, translations)
+
+
+def run(rows=10000, seed=42, periods=((2024, 5),), min_saving=1500, mode="streaming",
+        latency=0.05, error_rate=0.0, kpis=3, statement_chars=300, translate_delay=0.1,
+        workers=8, batch_size=50, translate_workers=4, engine="openpyxl",
+        projection=True, compress=True, workdir=None, use_tracemalloc=False):
+    """Chạy một lần benchmark, trả về dict kết quả (dùng được từ pytest-benchmark hoặc script)."""
+    workdir = workdir or os.path.join(tempfile.gettempdir(), "rd_report_bench")
+    master, template = prepare_inputs(workdir, rows, seed)
+
+    tracer = Tracer()
+    backend = StubBackend(delay=translate_delay)
+    translator = TranslationService(backend, max_workers=translate_workers, tracer=tracer)
+
+    if use_tracemalloc:
+        tracemalloc.start()
+    with StubEkaizenServer(latency=latency, error_rate=error_rate, kpis=kpis,
+                           statement_chars=statement_chars, compress=compress, seed=seed) as server:
+        with EkaizenClient("bench-token", "bench-cookie", max_workers=workers, rate_limit=0,
+                           batch_size=batch_size, backoff=0.05, base_url=server.base_url,
+                           fields=PROJECT_FIELDS if projection else None, tracer=tracer) as client:
+            start = time.perf_counter()
+            if mode == "phased":
+                files = _run_phased(master, template, list(periods), client, translator,
+                                    min_saving, engine, tracer)
+            else:
+                files = generate_reports(master, template, list(periods), client, translator=translator,
+                                         min_saving=min_saving, engine=engine, tracer=tracer)
+            elapsed = time.perf_counter() - start
+
+    peak_heap = None
+    if use_tracemalloc:
+        peak_heap = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        tracemalloc.stop()
+
+    return {
+        "mode": mode,
+        "rows": rows,
+        "periods": len(periods),
+        "reports": len(files),
+        "elapsed_s": round(elapsed, 3),
+        "http_requests": server.requests,
+        "http_bytes": server.bytes_sent,
+        "http_payload_bytes": tracer.counters.get("http_bytes", 0),
+        "translate_calls": backend.calls,
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "peak_heap_mb": round(peak_heap, 1) if peak_heap is not None else None,
+        "stages": tracer.stage_totals(),
+        "http_latency_ms": tracer.percentiles("http"),
+    }
+
+
+def _parse_period(value):
+    year, month = value.split("-")
+    return int(year), int(month)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench.run_benchmark", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000, help="Master Data rows (10k-500k)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--period", type=_parse_period, default=(2024, 5), help="First period, YYYY-MM")
+    parser.add_argument("--to", type=_parse_period, help="Last period, YYYY-MM")
+    parser.add_argument("--min-saving", type=float, default=1500)
+    parser.add_argument("--mode", choices=("streaming", "phased"), default="streaming")
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub server delay per request (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument("--kpis", type=int, default=3, help="KPIs per project payload")
+    parser.add_argument("--statement-chars", type=int, default=300)
+    parser.add_argument("--translate-delay", type=float, default=0.1, help="Stub translator delay per batch (s)")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--translate-workers", type=int, default=4)
+    parser.add_argument("--engine", choices=("openpyxl", "calamine", "auto"), default="openpyxl",
+                        help="Master Data parser; 'auto' may hit the Parquet side-cache on repeat runs")
+    parser.add_argument("--workdir", help="Where generated inputs are kept (default: system temp dir)")
+    parser.add_argument("--full-payload", action="store_true", help="Fetch whole entities (no $select)")
+    parser.add_argument("--no-compress", action="store_true", help="Stub server answers uncompressed")
+    parser.add_argument("--tracemalloc", action="store_true", help="Also measure Python heap peak (slower)")
+    parser.add_argument("--json", help="Write the result to this file")
+    args = parser.parse_args(argv)
+
+    result = run(rows=args.rows, seed=args.seed, periods=month_range(args.period, args.to or args.period),
+                 min_saving=args.min_saving, mode=args.mode, latency=args.latency,
+                 error_rate=args.error_rate, kpis=args.kpis, statement_chars=args.statement_chars,
+                 translate_delay=args.translate_delay, workers=args.workers, batch_size=args.batch_size,
+                 translate_workers=args.translate_workers, engine=args.engine,
+                 projection=not args.full_payload, compress=not args.no_compress, workdir=args.workdir,
+                 use_tracemalloc=args.tracemalloc)
+
+    print(f"{result['mode']}: {result['reports']} report(s) from {result['rows']} rows "
+          f"in {result['elapsed_s']:.2f}s")
+    print(f"  http requests: {result['http_requests']} ({result['http_bytes'] / 1024:.0f} KiB on the wire, "
+          f"{result['http_payload_bytes'] / 1024:.0f} KiB decoded), translate calls: {result['translate_calls']}")
+    print(f"  peak RSS: {result['peak_rss_mb']} MB"
+          + (f", peak heap: {result['peak_heap_mb']} MB" if result['peak_heap_mb'] is not None else ""))
+    if result["http_latency_ms"]:
+        print("  http latency (ms): " + ", ".join(f"{k}={v:.0f}" for k, v in result["http_latency_ms"].items()))
+    print(f"  {'stage':<16}{'count':>8}{'total ms':>12}{'mean ms':>10}{'max ms':>10}")
+    for stage in result["stages"]:
+        print(f"  {stage['stage']:<16}{stage['count']:>8}{stage['total_ms']:>12.1f}"
+              f"{stage['mean_ms']:>10.2f}{stage['max_ms']:>10.1f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+"""HTTP server giả lập /api/odata/Project của ekaizen: có độ trễ, lỗi ngẫu nhiên và payload KPI tuỳ chỉnh.
+
+Hiểu $select, $expand(...;$select=...) và nén gzip khi client gửi Accept-Encoding: gzip.
+"""
+import gzip
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, unquote, urlencode, urlparse
+
+_WORDS = ("improve reduce scrap rework cycle time line balance kaizen operator training "
+          "standard work defect yield changeover downtime inventory").split()
+
+# Navigation property của Project: chỉ có trong payload khi được $expand
+_NAVIGATION = ("teamLeader", "eventBaseLineKPIs")
+
+
+def _split_top(value):
+    """Tách theo dấu phẩy không nằm trong ngoặc: "a($select=x,y),b" -> ["a($select=x,y)", "b"]."""
+    parts, depth, current = [], 0, ""
+    for ch in value:
+        if ch == "," and depth == 0:
+            parts.append(current)
+            current = ""
+            continue
+        depth += (ch == "(") - (ch == ")")
+        current += ch
+    if current:
+        parts.append(current)
+    return [p.strip() for p in parts if p.strip()]
+
+
+def parse_projection(query):
+    """query: dict từ parse_qs; trả về (select, expand) với select là set field hoặc None (= tất cả)
+    và expand là dict navigation property -> set field con hoặc None."""
+    select = set(_split_top(query["$select"][0])) if "$select" in query else None
+    expand = {}
+    for item in _split_top(query.get("$expand", [""])[0]):
+        match = re.fullmatch(r"(\w+)(?:\(\$select=([^)]*)\))?", item)
+        if match:
+            expand[match.group(1)] = set(_split_top(match.group(2))) if match.group(2) else None
+    return select, expand
+
+
+def project_entity(project, select, expand):
+    """Cắt payload theo $select/$expand như OData: navigation property chỉ có khi được expand."""
+    result = {}
+    for key, value in project.items():
+        if key in _NAVIGATION:
+            if key not in expand:
+                continue
+            fields = expand[key]
+            if fields is not None:
+                if isinstance(value, list):
+                    value = [{k: v for k, v in item.items() if k in fields} for item in value]
+                elif value is not None:
+                    value = {k: v for k, v in value.items() if k in fields}
+            result[key] = value
+        elif select is None or key in select:
+            result[key] = value
+    return result
+
+
+class StubEkaizenServer:
+    """Dùng như context manager; base_url trỏ vào OData root giả.
+
+    latency: giây chờ mỗi request; error_rate: tỉ lệ trả 503; missing_rate: tỉ lệ ID không tồn tại;
+    kpis: số KPI mỗi project; statement_chars: độ dài projectStatement; page_size: số project mỗi trang;
+    compress: nén gzip khi client chấp nhận. bytes_sent đếm byte thật sự gửi đi (sau khi nén).
+    """
+
+    def __init__(self, latency=0.05, error_rate=0.0, missing_rate=0.0, kpis=3,
+                 statement_chars=300, page_size=100, compress=True, seed=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.missing_rate = missing_rate
+        self.kpis = kpis
+        self.statement_chars = statement_chars
+        self.page_size = page_size
+        self.compress = compress
+        self.seed = seed
+        self.requests = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+        self._server = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self._server.server_port}/api/odata"
+
+    def project(self, eid):
+        rng = random.Random(self.seed * 1000003 + eid)
+        if rng.random() < self.missing_rate:
+            return None
+        statement = []
+        while sum(len(w) + 1 for w in statement) < self.statement_chars:
+            statement.append(rng.choice(_WORDS))
+        return {
+            "id": eid,
+            "name": f"{rng.choice(_WORDS).title()} {rng.choice(_WORDS)} project {eid % 500}",
+            "closedDate": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T08:30:00.000Z",
+            "projectStatement": " ".join(statement),
+            "teamLeader": {"id": eid % 40, "name": f"Leader {eid % 40}", "email": f"leader{eid % 40}@example.com"},
+            "eventBaseLineKPIs": [
+                {"kpiName": f"KPI {k}", "baseLineKPIValue": rng.randint(50, 100),
+                 "actualKPIValue": rng.randint(80, 120), "unit": "%", "comment": "x" * 40}
+                for k in range(self.kpis)
+            ],
+            "status": "Closed",
+            "site": "JVN",
+            "description": "y" * 200,
+        }
+
+    def _handle(self, handler):
+        with self._lock:
+            self.requests += 1
+            fail = self._rng.random() < self.error_rate
+        if self.latency:
+            time.sleep(self.latency)
+        if fail:
+            handler.send_response(503)
+            handler.send_header("Content-Length", "0")
+            handler.end_headers()
+            return
+
+        path = unquote(handler.path)
+        single = re.search(r"/Project\((\d+)\)", path)
+        batch = re.search(r"id in \(([\d,\s]*)\)", path)
+        if single:
+            ids = [int(single.group(1))]
+        elif batch:
+            ids = [int(x) for x in batch.group(1).split(",") if x.strip()]
+        else:
+            handler.send_response(400)
+            handler.send_header("Content-Length", "0")
+            handler.end_headers()
+            return
+
+        query = parse_qs(urlparse(handler.path).query)
+        select, expand = parse_projection(query)
+        projects = [project_entity(p, select, expand) for p in (self.project(eid) for eid in ids) if p]
+        skip = int(query.get("$skip", ["0"])[0])
+        data = {"value": projects[skip:skip + self.page_size]}
+        if batch and skip + self.page_size < len(projects):
+            # nextLink giữ nguyên các query option ($filter, $select, $expand), chỉ đổi $skip
+            next_query = {k: v[0] for k, v in query.items() if k != "$skip"}
+            next_query["$skip"] = skip + self.page_size
+            data["@odata.nextLink"] = "Project?" + urlencode(next_query, safe="$(),=;", quote_via=quote)
+
+        body = json.dumps(data).encode()
+        encoding = None
+        if self.compress and "gzip" in handler.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body, compresslevel=6)
+            encoding = "gzip"
+        with self._lock:
+            self.bytes_sent += len(body)
+        handler.send_response(200)
+        handler.send_header("Content-Type", "application/json")
+        if encoding:
+            handler.send_header("Content-Encoding", encoding)
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def start(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                stub._handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,86 @@
+"""Sinh file Master Data và template giả lập để benchmark, không cần dữ liệu thật."""
+import random
+from datetime import datetime, timedelta
+
+from openpyxl import Workbook
+from openpyxl.styles import Alignment, Font
+
+from master_data import SHEET_NAME
+from report_writer import REPORT_COLUMNS
+
+FIRST_PROJECT_ID = 100000
+
+_WORDS = ("reduce scrap rework cycle time changeover line balance kaizen 5S SMED OEE "
+          "downtime yield defect inventory layout operator training standard work").split()
+
+
+def _closed_date(rng, start, days):
+    dt = start + timedelta(days=rng.randrange(days))
+    kind = rng.randrange(5)
+    # Trộn nhiều định dạng như file thật: ô ngày Excel, dd/mm/yyyy, ISO, d-Mon-yy, ô trống
+    if kind == 0:
+        return dt
+    if kind == 1:
+        return dt.strftime("%d/%m/%Y")
+    if kind == 2:
+        return dt.strftime("%Y-%m-%d")
+    if kind == 3:
+        return f"{dt.day}-{dt.strftime('%b-%y')}"
+    return None if rng.random() < 0.2 else dt
+
+
+def _hard_saving(rng):
+    value = rng.choice((0, rng.randrange(0, 1500), rng.randrange(1500, 50000)))
+    kind = rng.randrange(4)
+    if kind == 0:
+        return value
+    if kind == 1:
+        return f"${value:,}"
+    if kind == 2:
+        return f" {value:,} "
+    return float(value)
+
+
+def make_master_workbook(path, rows=10000, seed=42, start=datetime(2023, 1, 1), days=730):
+    """Ghi sheet "Data Consolidate" với header ở dòng 2 (giống file Lean KPI Master Data)."""
+    rng = random.Random(seed)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(SHEET_NAME)
+    ws.append(["Lean KPI Dashboard - Master Data"])
+    ws.append(["Region", "Site", "Project ID", "Project Name", "Closed Date",
+               "Hard saving validated", "Soft saving", "Status", "Owner", "Comment"])
+    for i in range(rows):
+        ws.append([
+            "APAC",
+            rng.choice(("JVN", "JCN", "JMY")),
+            FIRST_PROJECT_ID + i,
+            " ".join(rng.choices(_WORDS, k=4)),
+            _closed_date(rng, start, days),
+            _hard_saving(rng),
+            rng.randrange(0, 10000),
+            rng.choice(("Closed", "Closed", "In progress")),
+            f"Owner {rng.randrange(200)}",
+            " ".join(rng.choices(_WORDS, k=rng.randrange(0, 12))),
+        ])
+    wb.save(path)
+    return path
+
+
+def make_template(path):
+    """Template cùng bố cục với "R&D Report_Template for LEAN.xlsx": sheet ENG/VIE, header dòng 4, data từ dòng 5."""
+    wb = Workbook()
+    eng = wb.active
+    eng.title = "ENG"
+    vie = wb.create_sheet("VIE")
+    for ws in (eng, vie):
+        ws["A1"] = "R&D REPORT"
+        ws["A1"].font = Font(bold=True, size=14)
+        ws["A2"] = "Lean Team JVN"
+        for col, heading in enumerate(REPORT_COLUMNS, start=1):
+            cell = ws.cell(row=4, column=col, value=heading)
+            cell.font = Font(bold=True)
+            cell.alignment = Alignment(wrap_text=True, vertical="center")
+        for letter, width in zip("ABCDEFGH", (14, 14, 40, 22, 16, 60, 60, 8)):
+            ws.column_dimensions[letter].width = width
+    wb.save(path)
+    return path
@@ -0,0 +1,122 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+
+# SQLite giới hạn số tham số trong một câu lệnh
+_CHUNK = 500
+
+
+# JSON không có kiểu ngày -> lưu datetime dạng {"__datetime__": "ISO"}
+def _encode(value):
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _decode(obj):
+    if len(obj) == 1 and "__datetime__" in obj:
+        return datetime.fromisoformat(obj["__datetime__"])
+    return obj
+
+
+class DiskCache:
+    """Key-value cache trên SQLite: giá trị lưu dạng JSON, có TTL và giới hạn số entry (LRU).
+
+    ttl (giây) và max_entries = None nghĩa là không giới hạn.
+    """
+
+    def __init__(self, path, table="entries", ttl=None, max_entries=None):
+        self.path = path
+        self.table = table
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table}(accessed)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get_many(self, keys):
+        """Trả về dict key -> value cho các key còn hạn; cập nhật thời gian truy cập (LRU)."""
+        keys = list(dict.fromkeys(str(k) for k in keys))
+        found = {}
+        now = time.time()
+
+        with self._connect() as conn:
+            for i in range(0, len(keys), _CHUNK):
+                chunk = keys[i:i + _CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"SELECT key, value, created FROM {self.table} WHERE key IN ({placeholders})", chunk
+                )
+                for key, value, created in rows:
+                    if self.ttl and now - created > self.ttl:
+                        continue
+                    found[key] = json.loads(value, object_hook=_decode)
+            conn.executemany(
+                f"UPDATE {self.table} SET accessed = ? WHERE key = ?", [(now, k) for k in found]
+            )
+
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def set_many(self, items):
+        if not items:
+            return
+        now = time.time()
+        rows = [(str(k), json.dumps(v, ensure_ascii=False, default=_encode), now, now) for k, v in items.items()]
+
+        with self._connect() as conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, created, accessed) VALUES (?, ?, ?, ?)", rows
+            )
+            if self.ttl:
+                conn.execute(f"DELETE FROM {self.table} WHERE created < ?", (now - self.ttl,))
+            if self.max_entries:
+                # Xoá các entry ít được dùng gần đây nhất khi vượt quá giới hạn
+                conn.execute(
+                    f"DELETE FROM {self.table} WHERE key IN ("
+                    f"SELECT key FROM {self.table} ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                    (int(self.max_entries),),
+                )
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute(f"DELETE FROM {self.table}")
+
+    def count(self):
+        with self._connect() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+
+def project_cache(ttl=None, max_entries=None):
+    return DiskCache(os.path.join(CACHE_DIR, "projects.sqlite"), "projects", ttl=ttl, max_entries=max_entries)
+
+
+def translation_memory(max_entries=None):
+    # Bản dịch không hết hạn, chỉ bị đẩy ra theo LRU
+    return DiskCache(os.path.join(CACHE_DIR, "translations.sqlite"), "translations_en_vi", max_entries=max_entries)
@@ -0,0 +1,256 @@
+import importlib.util
+import random
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from http.cookiejar import DefaultCookiePolicy
+from urllib.parse import urljoin
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from instrumentation import NULL_TRACER
+
+BASE_URL = "https://ekaizen.jblapps.com/api/odata"
+PROJECT_EXPAND = "teamLeader,eventBaseLineKPIs"
+
+# Nén payload khi truyền; br chỉ khi có gói brotli để urllib3 giải nén được
+ACCEPT_ENCODING = ("gzip, deflate, br"
+                   if importlib.util.find_spec("brotli") or importlib.util.find_spec("brotlicffi")
+                   else "gzip, deflate")
+
+# Các status nên thử lại (bị giới hạn tốc độ hoặc lỗi phía server)
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Kết quả fetch một project: project là dict từ API (hoặc None), error là chuỗi lỗi (hoặc None)
+ProjectResult = namedtuple("ProjectResult", ["eid", "project", "error"])
+
+
+def build_headers(authorization, cookie):
+    return {
+        "User-Agent": "Mozilla/5.0",
+        "Accept": "application/json, text/plain, */*",
+        "Accept-Encoding": ACCEPT_ENCODING,
+        "Authorization": f"Bearer {authorization}",
+        "Cookie": cookie,
+    }
+
+
+def projection_query(fields):
+    """Dựng $select/$expand từ dict field -> None (field thường) hoặc tuple field con (navigation property).
+
+    {"id": None, "teamLeader": ("name",)} -> "$select=id&$expand=teamLeader($select=name)"
+    """
+    select = [name for name, sub in fields.items() if sub is None]
+    expand = [f"{name}($select={','.join(sub)})" if sub else name
+              for name, sub in fields.items() if sub is not None]
+    parts = []
+    if select:
+        parts.append("$select=" + ",".join(select))
+    if expand:
+        parts.append("$expand=" + ",".join(expand))
+    return "&".join(parts)
+
+
+def make_session(pool_size=8):
+    """Session có connection pool, không kèm thông tin đăng nhập nên dùng chung được giữa nhiều client.
+
+    Không lưu cookie server trả về: Cookie/Authorization của từng người gửi theo từng request.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    return session
+
+
+class RateLimiter:
+    """Token bucket dùng chung giữa các thread; rate <= 0 nghĩa là không giới hạn."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate or self.rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            # Giữ chỗ trước, token có thể âm -> các thread sau sẽ chờ lâu hơn
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait > 0:
+            time.sleep(wait)
+
+
+class EkaizenClient:
+    def __init__(self, authorization, cookie, max_workers=8, rate_limit=10.0,
+                 max_retries=3, backoff=0.5, timeout=30, base_url=BASE_URL, batch_size=50,
+                 session=None, fields=None, tracer=None):
+        self.max_workers = max(1, int(max_workers))
+        # batch_size = 1 -> mỗi project một request Project(id) như cũ
+        self.batch_size = max(1, int(batch_size))
+        self.max_retries = max(0, int(max_retries))
+        self.backoff = backoff
+        self.timeout = timeout
+        self.base_url = base_url.rstrip("/")
+        self.limiter = RateLimiter(rate_limit, burst=self.max_workers)
+        self.tracer = tracer or NULL_TRACER
+        # fields (vd. normalize.PROJECT_FIELDS): chỉ lấy các field này; None -> cả entity như cũ
+        self.query = projection_query(fields) if fields else f"$expand={PROJECT_EXPAND}"
+
+        # Session dùng chung -> giữ kết nối keep-alive, không phải bắt tay TLS cho mỗi project.
+        # session truyền vào (vd. từ st.cache_resource) thì dùng lại và không đóng khi close()
+        self.headers = build_headers(authorization, cookie)
+        self._owns_session = session is None
+        self.session = make_session(self.max_workers) if session is None else session
+
+    def close(self):
+        if self._owns_session:
+            self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _retry_delay(self, attempt, response=None):
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return float(retry_after)
+        return self.backoff * (2 ** attempt) + random.uniform(0, self.backoff)
+
+    def get(self, url):
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            self.tracer.incr("http_requests")
+            start = time.perf_counter()
+            try:
+                response = self.session.get(url, headers=self.headers, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self.tracer.record("http", time.perf_counter() - start, start=start,
+                                   status=type(e).__name__, bytes=0, attempt=attempt, url=url)
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self._retry_delay(attempt))
+                continue
+
+            # bytes: payload sau khi giải nén; wire_bytes: số byte thật sự đi qua mạng
+            size = len(response.content)
+            wire_size = response.raw.tell() if hasattr(response.raw, "tell") else size
+            self.tracer.record("http", time.perf_counter() - start, start=start,
+                               status=response.status_code, bytes=size, wire_bytes=wire_size,
+                               encoding=response.headers.get("Content-Encoding", ""),
+                               attempt=attempt, url=url)
+            self.tracer.incr("http_bytes", size)
+            self.tracer.incr("http_wire_bytes", wire_size)
+            if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                return response
+            time.sleep(self._retry_delay(attempt, response))
+
+    def project_url(self, eid):
+        return f"{self.base_url}/Project({eid})?$count=true&{self.query}"
+
+    def fetch_project(self, eid):
+        try:
+            response = self.get(self.project_url(eid))
+        except Exception as e:
+            return ProjectResult(eid, None, str(e))
+
+        if response.status_code != 200:
+            return ProjectResult(eid, None, f"Status {response.status_code}")
+
+        value = response.json().get("value")
+        if not value:
+            return ProjectResult(eid, None, "Project not found")
+        return ProjectResult(eid, value[0], None)
+
+    def batch_url(self, project_ids):
+        id_list = ",".join(str(eid) for eid in project_ids)
+        return f"{self.base_url}/Project?$filter=id in ({id_list})&{self.query}"
+
+    def fetch_batch(self, project_ids):
+        """Lấy nhiều project bằng một query $filter=id in (...), đi theo @odata.nextLink.
+
+        Trả về list ProjectResult theo thứ tự project_ids; ID không có trong response -> error.
+        """
+        found = {}
+        error = None
+        url = self.batch_url(project_ids)
+        try:
+            while url:
+                response = self.get(url)
+                if response.status_code != 200:
+                    error = f"Status {response.status_code}"
+                    break
+                data = response.json()
+                for p in data.get("value") or []:
+                    found[str(p.get("id"))] = p
+                next_link = data.get("@odata.nextLink")
+                url = urljoin(self.base_url + "/", next_link) if next_link else None
+        except Exception as e:
+            error = str(e)
+
+        results = []
+        for eid in project_ids:
+            p = found.get(str(eid))
+            if p is not None:
+                results.append(ProjectResult(eid, p, None))
+            else:
+                results.append(ProjectResult(eid, None, error or "Project not found"))
+        return results
+
+    def _iter_chunks(self, project_ids):
+        """Sinh (vị trí trong project_ids, list ProjectResult) theo thứ tự hoàn thành."""
+        total = len(project_ids)
+        if self.batch_size > 1:
+            chunks = [list(range(i, min(i + self.batch_size, total)))
+                      for i in range(0, total, self.batch_size)]
+            task = lambda idxs: self.fetch_batch([project_ids[i] for i in idxs])
+        else:
+            chunks = [[i] for i in range(total)]
+            task = lambda idxs: [self.fetch_project(project_ids[idxs[0]])]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {pool.submit(task, idxs): idxs for idxs in chunks}
+            try:
+                for future in as_completed(futures):
+                    yield futures[future], future.result()
+            finally:
+                # Generator bị đóng giữa chừng (pipeline dừng) thì bỏ các chunk chưa chạy
+                for future in futures:
+                    future.cancel()
+
+    def iter_projects(self, project_ids):
+        """Sinh từng ProjectResult ngay khi có (thứ tự hoàn thành, không theo project_ids)."""
+        for _, results in self._iter_chunks(list(project_ids)):
+            yield from results
+
+    def fetch_projects(self, project_ids, on_progress=None):
+        """Fetch song song, trả về list ProjectResult theo đúng thứ tự project_ids.
+
+        Với batch_size > 1, mỗi request lấy một nhóm ID; ngược lại mỗi project một request.
+        on_progress(done, total, eid) được gọi trên thread gọi hàm (an toàn cho Streamlit).
+        """
+        project_ids = list(project_ids)
+        total = len(project_ids)
+        results = [None] * total
+
+        done = 0
+        for idxs, chunk_results in self._iter_chunks(project_ids):
+            for idx, result in zip(idxs, chunk_results):
+                results[idx] = result
+            done += len(idxs)
+            if on_progress:
+                on_progress(done, total, project_ids[idxs[-1]])
+
+        return results
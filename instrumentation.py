@@ -0,0 +1,127 @@
+import csv
+import io
+import json
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class Tracer:
+    """Ghi lại thời gian từng bước (stage) và các counter; dùng chung được giữa các thread.
+
+    Mỗi event là một dict: stage, start (giây kể từ lúc tạo tracer), duration_ms và các field thêm
+    (status, bytes, rows...). max_events: chỉ giữ ngần ấy event gần nhất (None = không giới hạn).
+    """
+
+    def __init__(self, max_events=None):
+        self.events = deque(maxlen=max_events)
+        self.counters = {}
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def now(self):
+        """Giây kể từ lúc tạo tracer, cùng gốc với field start của event."""
+        return time.perf_counter() - self._origin
+
+    def record(self, stage, duration, start=None, **fields):
+        event = {
+            "stage": stage,
+            "start": round((start if start is not None else time.perf_counter() - duration) - self._origin, 6),
+            "duration_ms": round(duration * 1000, 3),
+            **fields,
+        }
+        with self._lock:
+            self.events.append(event)
+
+    @contextmanager
+    def span(self, stage, **fields):
+        start = time.perf_counter()
+        try:
+            yield fields
+        finally:
+            self.record(stage, time.perf_counter() - start, start=start, **fields)
+
+    def incr(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def clear(self):
+        with self._lock:
+            self.events = deque(maxlen=self.events.maxlen)
+            self.counters = {}
+            self._origin = time.perf_counter()
+
+    def durations(self, stage):
+        with self._lock:
+            return [e["duration_ms"] for e in self.events if e["stage"] == stage]
+
+    def stage_totals(self):
+        """Tổng hợp theo stage: số lần, tổng thời gian, trung bình và lớn nhất (ms)."""
+        stages = {}
+        with self._lock:
+            for e in self.events:
+                stages.setdefault(e["stage"], []).append(e["duration_ms"])
+        return [
+            {
+                "stage": stage,
+                "count": len(values),
+                "total_ms": round(sum(values), 3),
+                "mean_ms": round(sum(values) / len(values), 3),
+                "max_ms": max(values),
+            }
+            for stage, values in stages.items()
+        ]
+
+    def percentiles(self, stage, ps=(50, 90, 95, 99)):
+        values = sorted(self.durations(stage))
+        if not values:
+            return {}
+        # nearest-rank
+        return {f"p{p}": values[max(0, math.ceil(p / 100 * len(values)) - 1)] for p in ps}
+
+    def histogram(self, stage, bins=10):
+        """Chia thời gian của stage thành các khoảng bằng nhau: list (nhãn, số lần)."""
+        values = self.durations(stage)
+        if not values:
+            return []
+        low, high = min(values), max(values)
+        width = (high - low) / bins or 1
+        counts = [0] * bins
+        for v in values:
+            counts[min(int((v - low) / width), bins - 1)] += 1
+        return [(f"{low + i * width:.0f}-{low + (i + 1) * width:.0f} ms", c) for i, c in enumerate(counts)]
+
+    def to_json(self):
+        with self._lock:
+            data = {"counters": dict(self.counters), "events": list(self.events)}
+        data["stages"] = self.stage_totals()
+        return json.dumps(data, ensure_ascii=False, indent=2)
+
+    def to_csv(self):
+        with self._lock:
+            events = list(self.events)
+        fieldnames = list(dict.fromkeys(key for e in events for key in e)) or ["stage", "start", "duration_ms"]
+        output = io.StringIO()
+        writer = csv.DictWriter(output, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(events)
+        return output.getvalue()
+
+
+class _NullTracer:
+    """Tracer không làm gì, dùng khi không cần đo."""
+
+    def record(self, stage, duration, start=None, **fields):
+        pass
+
+    @contextmanager
+    def span(self, stage, **fields):
+        yield fields
+
+    def incr(self, name, n=1):
+        pass
+
+
+NULL_TRACER = _NullTracer()
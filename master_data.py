@@ -0,0 +1,327 @@
+import hashlib
+import importlib.util
+import os
+import threading
+from collections import OrderedDict, namedtuple
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+from disk_cache import CACHE_DIR
+from instrumentation import NULL_TRACER
+from normalize import clean_currency, parse_dates
+
+SHEET_NAME = "Data Consolidate"
+HEADER_ROW = 1  # header nằm ở dòng thứ 2 của sheet
+
+# Tên cột có thể gặp trong file Master Data
+COLUMN_ALIASES = {
+    'closed_date': ['Closed Date', 'closed date', 'CloseDate', 'Close Date'],
+    'hard_saving': ['Hard saving validated', 'Hard Saving Validated', 'HardSaving'],
+    'project_id': ['Project ID', 'ProjectID', 'id', 'ID'],
+}
+
+PARQUET_DIR = os.path.join(CACHE_DIR, "master")
+# Số file Parquet side-cache giữ lại; file dùng lâu nhất (theo mtime) bị xoá trước
+PARQUET_MAX_FILES = 8
+
+
+def file_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def has_calamine():
+    return importlib.util.find_spec("python_calamine") is not None
+
+
+def has_parquet():
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def month_range(start, end):
+    """Danh sách (năm, tháng) từ start đến end (bao gồm cả hai đầu)."""
+    (year, month), (end_year, end_month) = start, end
+    periods = []
+    while (year, month) <= (end_year, end_month):
+        periods.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return periods
+
+
+def read_header(data, sheet_name=SHEET_NAME, header=HEADER_ROW):
+    """Chỉ đọc dòng header (openpyxl read-only), trả về tên cột giống như pandas đặt."""
+    from openpyxl import load_workbook
+
+    wb = load_workbook(BytesIO(data), read_only=True, data_only=True)
+    try:
+        ws = wb[sheet_name]
+        row = next(ws.iter_rows(min_row=header + 1, max_row=header + 1, values_only=True), ())
+    finally:
+        wb.close()
+
+    columns = []
+    for i, value in enumerate(row):
+        if value is None:
+            columns.append(f"Unnamed: {i}")
+        else:
+            columns.append(value.strip() if isinstance(value, str) else value)
+    return columns
+
+
+def find_column(columns, possible_names):
+    cols_lower = {}
+    for col in columns:
+        # Convert mọi kiểu dữ liệu sang string
+        cols_lower[str(col).lower().strip()] = col
+
+    for name in possible_names:
+        name_lower = name.lower().strip()
+        if name_lower in cols_lower:
+            return cols_lower[name_lower]
+    return None
+
+
+def resolve_columns(columns):
+    """Trả về dict {'closed_date': ..., 'hard_saving': ..., 'project_id': ...}; cột không tìm thấy -> None."""
+    return {key: find_column(columns, names) for key, names in COLUMN_ALIASES.items()}
+
+
+def clean_master_frame(df, col_names):
+    closed_date_col = col_names['closed_date']
+    hard_saving_col = col_names['hard_saving']
+
+    df[closed_date_col] = parse_dates(df[closed_date_col])
+    df[hard_saving_col] = clean_currency(df[hard_saving_col])
+    return df
+
+
+def _downcast(series):
+    """Số -> kiểu nhỏ nhất không làm đổi giá trị; chuỗi lặp nhiều -> category."""
+    if pd.api.types.is_integer_dtype(series):
+        return pd.to_numeric(series, downcast="integer")
+    if pd.api.types.is_float_dtype(series):
+        small = pd.to_numeric(series, downcast="float")
+        lossless = np.array_equal(small.to_numpy(dtype=float), series.to_numpy(dtype=float), equal_nan=True)
+        return small if lossless else series
+    if series.dtype == object and series.nunique(dropna=True) <= len(series) // 2:
+        return series.astype("category")
+    return series
+
+
+def compact_master_frame(df, col_names):
+    """Bản gọn của frame Master Data để giữ lâu trong RAM: Project ID là số nguyên (nullable),
+    Closed Date là datetime64, các cột còn lại được downcast hoặc chuyển sang category."""
+    df = df.copy()
+    project_id_col = col_names['project_id']
+    closed_date_col = col_names['closed_date']
+    if not pd.api.types.is_datetime64_any_dtype(df[closed_date_col]):
+        df[closed_date_col] = parse_dates(df[closed_date_col])
+    for col in df.columns:
+        if col not in (project_id_col, closed_date_col):
+            df[col] = _downcast(df[col])
+
+    # ID đọc từ Excel thành float (hoặc object) khi có ô trống
+    ids = pd.to_numeric(df[project_id_col], errors='coerce')
+    if ids.dtype.kind == 'f' and (ids.dropna() % 1 == 0).all():
+        ids = ids.astype("Int64" if ids.isna().any() else "int64")
+    df[project_id_col] = _downcast(ids)
+    return df.reset_index(drop=True)
+
+
+def _read_excel(data, sheet_name, header, usecols, engine):
+    return pd.read_excel(BytesIO(data), sheet_name=sheet_name, header=header,
+                         usecols=usecols, engine=engine)
+
+
+def load_master_data(data, col_names, columns, sheet_name=SHEET_NAME, header=HEADER_ROW,
+                     engine="auto", digest=None, tracer=None):
+    """Đọc các cột cần thiết của sheet Master Data và làm sạch.
+
+    columns là header đã đọc bằng read_header; chỉ các cột trong col_names được parse.
+    engine: "auto" (parquet side-cache -> calamine -> openpyxl), "calamine" hoặc "openpyxl".
+    Trả về (df, backend đã dùng).
+    """
+    with (tracer or NULL_TRACER).span("master_load", bytes=len(data)) as span:
+        df, backend = _load_master_data(data, col_names, columns, sheet_name, header, engine, digest)
+        span.update(rows=len(df), backend=backend)
+    return df, backend
+
+
+def _load_master_data(data, col_names, columns, sheet_name, header, engine, digest):
+    wanted = list(dict.fromkeys(col_names.values()))
+    positions = sorted(columns.index(col) for col in wanted)
+    digest = digest or file_hash(data)
+
+    parquet_path = None
+    if engine == "auto" and has_parquet():
+        key = hashlib.sha1(repr((sheet_name, header, positions)).encode()).hexdigest()[:12]
+        parquet_path = os.path.join(PARQUET_DIR, f"{digest}-{key}.parquet")
+        if os.path.exists(parquet_path):
+            df = pd.read_parquet(parquet_path)
+            _touch(parquet_path)
+            return df, "parquet"
+
+    if engine == "auto":
+        engine = "calamine" if has_calamine() else "openpyxl"
+
+    df = _read_excel(data, sheet_name, header, positions, engine)
+    df.columns = [columns[i] for i in positions]
+    df = df.dropna(how='all')
+    df = clean_master_frame(df, col_names)
+
+    if parquet_path:
+        try:
+            os.makedirs(PARQUET_DIR, exist_ok=True)
+            df.to_parquet(parquet_path + ".tmp")
+            os.replace(parquet_path + ".tmp", parquet_path)
+        except Exception:
+            # Cột object lẫn kiểu dữ liệu -> bỏ qua side-cache, lần sau đọc lại từ Excel
+            pass
+        else:
+            _prune_parquet_cache()
+
+    return df, engine
+
+
+def _touch(path):
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def _prune_parquet_cache(max_files=PARQUET_MAX_FILES):
+    """Chỉ giữ max_files file Parquet mới dùng gần nhất trong PARQUET_DIR."""
+    try:
+        entries = [entry for entry in os.scandir(PARQUET_DIR)
+                   if entry.is_file() and entry.name.endswith(".parquet")]
+    except OSError:
+        return
+    entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in entries[max_files:]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            # File đang được process khác đọc/xoá -> để lần sau
+            pass
+
+
+def read_preview(data, sheet_name=SHEET_NAME, header=HEADER_ROW, nrows=10):
+    engine = "calamine" if has_calamine() else "openpyxl"
+    df = pd.read_excel(BytesIO(data), sheet_name=sheet_name, header=header, nrows=nrows, engine=engine)
+    df.columns = [c.strip() if isinstance(c, str) else c for c in df.columns]
+    return df
+
+
+class PeriodIndex:
+    """Index (năm, tháng) -> vị trí dòng trong frame Master Data.
+
+    Các dòng được sắp theo (kỳ, hard saving) nên mỗi kỳ là một đoạn liên tiếp với saving tăng dần;
+    lọc theo kỳ + ngưỡng saving chỉ là một phép searchsorted và cắt mảng.
+    """
+
+    def __init__(self, df, col_names):
+        dates = df[col_names['closed_date']]
+        savings = df[col_names['hard_saving']].to_numpy()
+        # Giữ float32 nếu frame đã được nén (compact_master_frame), còn lại dùng float64
+        if savings.dtype != np.float32:
+            savings = savings.astype(float)
+
+        valid = dates.notna().to_numpy()
+        positions = np.flatnonzero(valid)
+        keys = (dates[valid].dt.year.to_numpy(dtype=np.int64) * 12
+                + dates[valid].dt.month.to_numpy(dtype=np.int64) - 1)
+
+        order = np.lexsort((savings[positions], keys))
+        self._positions = positions[order].astype(np.int32 if len(df) < 2 ** 31 else np.int64)
+        self._savings = savings[positions][order]
+        self._cumsum = np.concatenate([[0.0], np.cumsum(self._savings, dtype=float)])
+
+        unique_keys, starts, counts = np.unique(keys[order], return_index=True, return_counts=True)
+        self._buckets = {
+            (int(k // 12), int(k % 12) + 1): (int(start), int(start + count))
+            for k, start, count in zip(unique_keys, starts, counts)
+        }
+
+    def periods(self):
+        return sorted(self._buckets)
+
+    def _first(self, start, stop, min_saving):
+        return start + int(np.searchsorted(self._savings[start:stop], min_saving, side='left'))
+
+    def positions(self, year, month, min_saving=0):
+        """Vị trí (iloc) các dòng của kỳ có saving >= min_saving, theo thứ tự gốc trong file."""
+        start, stop = self._buckets.get((int(year), int(month)), (0, 0))
+        first = self._first(start, stop, min_saving)
+        return np.sort(self._positions[first:stop])
+
+    def summary(self, min_saving=0):
+        rows = []
+        for (year, month), (start, stop) in sorted(self._buckets.items()):
+            first = self._first(start, stop, min_saving)
+            rows.append({
+                "Year": year,
+                "Month": month,
+                "Projects": stop - first,
+                "Total Saving": self._cumsum[stop] - self._cumsum[first],
+            })
+        return pd.DataFrame(rows, columns=["Year", "Month", "Projects", "Total Saving"])
+
+    @property
+    def nbytes(self):
+        return self._positions.nbytes + self._savings.nbytes + self._cumsum.nbytes
+
+
+# Một file Master Data trong MasterDataStore; nbytes = frame + PeriodIndex
+MasterEntry = namedtuple("MasterEntry", ["digest", "df", "col_names", "period_index", "backend", "nbytes"])
+
+
+class MasterDataStore:
+    """Giữ một bản Master Data đã nén cho mỗi file (theo hash nội dung), dùng chung giữa các session.
+
+    Session chỉ cần giữ digest; quá max_files thì bỏ file lâu không dùng nhất (LRU).
+    """
+
+    def __init__(self, max_files=4):
+        self.max_files = max(1, int(max_files))
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading = {}  # digest -> Lock, để hai session cùng upload một file chỉ parse một lần
+
+    def get(self, digest):
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None:
+                self._entries.move_to_end(digest)
+            return entry
+
+    def load(self, data, col_names, columns, digest=None, engine="auto", tracer=None):
+        """Trả về MasterEntry của file; chỉ parse khi file chưa có trong store."""
+        digest = digest or file_hash(data)
+        entry = self.get(digest)
+        if entry is not None:
+            return entry
+        with self._lock:
+            lock = self._loading.setdefault(digest, threading.Lock())
+        with lock:
+            entry = self.get(digest)
+            if entry is None:
+                df, backend = load_master_data(data, col_names, columns, digest=digest, engine=engine,
+                                               tracer=tracer)
+                df = compact_master_frame(df, col_names)
+                period_index = PeriodIndex(df, col_names)
+                nbytes = int(df.memory_usage(deep=True).sum()) + period_index.nbytes
+                entry = MasterEntry(digest, df, col_names, period_index, backend, nbytes)
+                with self._lock:
+                    self._entries[digest] = entry
+                    while len(self._entries) > self.max_files:
+                        self._entries.popitem(last=False)
+                    self._loading.pop(digest, None)
+        return entry
+
+    def memory_usage(self):
+        """Mỗi file một dict: digest, rows, bytes; file dùng gần nhất ở cuối."""
+        with self._lock:
+            entries = list(self._entries.values())
+        return [{"digest": e.digest, "rows": len(e.df), "bytes": e.nbytes} for e in entries]
@@ -0,0 +1,118 @@
+import random
+import re
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+# Ký tự điều khiển làm hỏng file Excel / bản dịch
+_CONTROL_CHARS = re.compile(r"[\x00-\x1F\x7F-\x9F]")
+
+# "$1,234" / " 1,500 " -> "1234" / "1500"
+_CURRENCY_CHARS = r"[\s$,]"
+
+# Các định dạng ngày hay gặp trong Master Data, thử lần lượt trước khi parse từng dòng.
+# ISO8601 cũng nhận luôn các ô ngày Excel (datetime) do openpyxl trả về.
+DATE_FORMATS = ("ISO8601", "%d/%m/%Y", "%d-%b-%y", "%d-%b-%Y", "%d/%m/%y")
+
+
+def clean_currency(series):
+    """Chuyển cột tiền (số, "$1,234", " 1,500 ") thành số; giá trị không đọc được -> 0."""
+    if pd.api.types.is_numeric_dtype(series):
+        return series.fillna(0)
+
+    # Số và chuỗi số sạch được parse một lần; chỉ những chuỗi còn lại mới qua regex
+    values = pd.to_numeric(series, errors='coerce')
+    rest = values.isna() & series.notna()
+    if rest.any():
+        cleaned = series[rest].astype(str).str.replace(_CURRENCY_CHARS, "", regex=True)
+        values[rest] = pd.to_numeric(cleaned, errors='coerce')
+    return values.fillna(0)
+
+
+def parse_dates(series, formats=DATE_FORMATS, dayfirst=True):
+    """Parse cột ngày lẫn định dạng: thử từng định dạng đã biết (vectorized), phần còn lại mới
+    parse từng dòng với format='mixed'. Không đọc được -> NaT."""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+
+    values = series.to_numpy(dtype=object)
+    result = np.full(len(values), np.datetime64("NaT"), dtype="datetime64[ns]")
+    pending = pd.notna(values)
+
+    for fmt in (*formats, "mixed"):
+        idx = np.flatnonzero(pending)
+        if not len(idx):
+            break
+        parsed = pd.to_datetime(pd.Series(values[idx]), format=fmt, dayfirst=dayfirst, errors='coerce')
+        ok = parsed.notna().to_numpy()
+        result[idx[ok]] = parsed[ok].to_numpy(dtype="datetime64[ns]")
+        pending[idx[ok]] = False
+
+    return pd.Series(result, index=series.index, name=series.name)
+
+
+def parse_closed_date(raw):
+    """closedDate của ekaizen ("2024-05-03T08:30:00.000Z") -> datetime UTC (naive); lỗi -> None."""
+    if not raw:
+        return None
+    if isinstance(raw, datetime):
+        dt = raw
+    else:
+        try:
+            dt = datetime.fromisoformat(raw.replace("Z", ""))
+        except ValueError:
+            try:
+                return datetime.strptime(raw.split("T")[0], "%Y-%m-%d")
+            except ValueError:
+                return None
+    # Excel không lưu được múi giờ: đổi về UTC rồi bỏ tzinfo
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def clean_string(s):
+    if not isinstance(s, str):
+        return s
+    return _CONTROL_CHARS.sub("", s)
+
+
+def kpi_text(kpis):
+    after_texts = []
+    for k in kpis:
+        name = k.get("kpiName") or k.get("name") or ""
+        base = k.get("baseLineKPIValue") or k.get("baseline") or ""
+        actual = k.get("actualKPIValue") or k.get("actual") or ""
+        if name:
+            after_texts.append(f"{name}: Baseline={base}, Actual={actual}")
+    return "\n".join(after_texts) if after_texts else "N/A"
+
+
+# Các field của Project mà normalize_project đọc: field thường -> None, navigation property -> tuple
+# field con. ekaizen_client dựng $select/$expand từ đây để chỉ tải những gì report dùng.
+# Các tên dự phòng (eventBaselineKPIs, name/baseline/actual của KPI) chỉ có khi tải cả entity.
+PROJECT_FIELDS = {
+    "id": None,
+    "name": None,
+    "closedDate": None,
+    "projectStatement": None,
+    "teamLeader": ("name",),
+    "eventBaseLineKPIs": ("kpiName", "baseLineKPIValue", "actualKPIValue"),
+}
+
+
+def normalize_project(p):
+    """Chuyển payload Project từ ekaizen thành một dòng report (chưa có cột Năm)."""
+    kpis = p.get("eventBaseLineKPIs") or p.get("eventBaselineKPIs") or []
+
+    return {
+        "Mã dự án\n(Project code)": p.get("id"),
+        # Ngày không đọc được thì giữ nguyên chuỗi gốc như report trước đây
+        "Ngày dự án\n(Project date)": parse_closed_date(p.get("closedDate")) or p.get("closedDate"),
+        "Tên dự án\n(Project name)": clean_string(p.get("name")),
+        "Quản lý dự án\n(Project lead)": (p.get("teamLeader") or {}).get("name"),
+        "Thời gian thực hiện dự án\n(Project timeline)": f"{random.randint(1,7)} months",
+        "Trước cải tiến\n(Before improvement)": clean_string(p.get("projectStatement", "")),
+        "Sau cải tiến\n(After improvement)": kpi_text(kpis),
+    }
@@ -0,0 +1,264 @@
+import queue
+import threading
+import time
+from contextlib import closing
+
+from instrumentation import NULL_TRACER
+
+from normalize import normalize_project
+from report_writer import YEAR_COLUMN, ReportWorkbook, report_filename, row_values
+
+STAGES = ("fetch", "normalize", "translate", "write")
+
+_DONE = object()
+
+# Thời gian tối đa chờ các thread stage kết thúc khi pipeline dừng giữa chừng
+JOIN_TIMEOUT = 5.0
+
+
+class _PeriodSink:
+    """Ghi các project của một kỳ theo đúng thứ tự ids, dù record đến theo thứ tự bất kỳ.
+
+    Record đến sớm được giữ lại cho tới khi mọi ID đứng trước nó đã có (hoặc đã biết là lỗi).
+    update=True: template là report cũ của kỳ này, chỉ thêm/thay các project mới hoặc đã đổi.
+    """
+
+    def __init__(self, template, ids, period, tracer=None, update=False):
+        self.report = ReportWorkbook(template, tracer=tracer, update=update, period=period)
+        self.ids = ids
+        self.year = period[0]
+        self.update = update
+        self.next = 0
+        self.arrived = {}
+
+    def needs_update(self, record):
+        return not self.update or self.report.needs_update({**record, YEAR_COLUMN: self.year})
+
+    def add(self, eid, record, translations):
+        self.arrived[eid] = (record, translations)
+        self._flush()
+
+    def _flush(self, final=False):
+        while self.next < len(self.ids):
+            eid = self.ids[self.next]
+            if eid in self.arrived:
+                record, translations = self.arrived[eid]
+                if record and self.update:
+                    self.report.upsert({**record, YEAR_COLUMN: self.year}, translations)
+                elif record:
+                    self.report.append({**record, YEAR_COLUMN: self.year}, translations)
+            elif not final:
+                break
+            self.next += 1
+
+    def finish(self):
+        self._flush(final=True)
+        return self.report.save()
+
+
+def stream_reports(template, period_project_ids, client, translator=None, cache=None,
+                   force_refresh=False, queue_size=64, translate_workers=4, translate_batch=16,
+                   on_progress=None, on_warning=None, existing=None, tracer=None):
+    """Chạy fetch -> normalize -> translate -> write chồng lấn nhau qua các queue có giới hạn.
+
+    Mỗi project đi qua các stage ngay khi được fetch xong; stage write chạy trên thread gọi hàm
+    nên on_progress(counts, total) và on_warning(message) an toàn cho Streamlit.
+    existing: dict (year, month) -> bytes của report đã tạo trước đó; kỳ nào có thì chỉ dịch và ghi
+    các project mới hoặc đã đổi vào report đó (xem ReportWorkbook.upsert).
+    Trả về (dict tên file -> file xlsx tạm, dict str(project_id) -> record).
+    Stage nào lỗi (kể cả stage write) thì mọi stage khác dừng theo, lỗi đầu tiên được raise lại.
+    """
+    tracer = tracer or NULL_TRACER
+    pipeline_start = time.perf_counter()
+    project_ids = list(dict.fromkeys(eid for ids in period_project_ids.values() for eid in ids))
+    total = len(project_ids)
+    existing = existing or {}
+    sinks = {
+        period: _PeriodSink(existing.get(period, template), ids, period, tracer=tracer, update=period in existing)
+        for period, ids in period_project_ids.items()
+    }
+    sinks_by_id = {}
+    for period, ids in period_project_ids.items():
+        for eid in dict.fromkeys(ids):
+            sinks_by_id.setdefault(eid, []).append(sinks[period])
+
+    # Không có sheet VIE thì bỏ qua bước dịch
+    if not any(sink.report.vie is not None for sink in sinks.values()):
+        translator = None
+    translate_workers = max(1, int(translate_workers)) if translator else 1
+
+    counts = dict.fromkeys(STAGES, 0)
+    counts_lock = threading.Lock()
+    warnings = []
+    errors = []
+    raw_q = queue.Queue(queue_size)
+    norm_q = queue.Queue(queue_size)
+    write_q = queue.Queue(queue_size)
+    # Được set khi có stage lỗi: stage khác thôi chờ queue và thoát
+    stop = threading.Event()
+
+    def count(stage):
+        with counts_lock:
+            counts[stage] += 1
+
+    def fail(error):
+        errors.append(error)
+        stop.set()
+
+    def put(q, item):
+        """Đặt item vào queue; trả về False nếu pipeline đã dừng trước khi còn chỗ."""
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def get(q):
+        """Lấy item từ queue; pipeline đã dừng thì coi như hết (_DONE)."""
+        while not stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        return _DONE
+
+    def fetch_stage():
+        try:
+            cached = {}
+            if cache is not None and not force_refresh:
+                with tracer.span("cache_lookup", keys=len(project_ids)) as span:
+                    cached = cache.get_many(project_ids)
+                    span["hits"] = len(cached)
+            # Record trong cache đã chuẩn hoá sẵn -> đi thẳng qua stage normalize
+            for eid in project_ids:
+                if str(eid) in cached:
+                    if not put(raw_q, (eid, cached[str(eid)], True)):
+                        return
+                    count("fetch")
+            missing = [eid for eid in project_ids if str(eid) not in cached]
+            if missing:
+                with closing(client.iter_projects(missing)) as results:
+                    for result in results:
+                        if result.error:
+                            warnings.append(f"Error fetching project {result.eid}: {result.error}")
+                        if not put(raw_q, (result.eid, result.project, False)):
+                            return
+                        count("fetch")
+        except Exception as e:
+            fail(e)
+        finally:
+            put(raw_q, _DONE)
+
+    def normalize_stage():
+        fetched = {}
+        try:
+            while (item := get(raw_q)) is not _DONE:
+                eid, payload, is_cached = item
+                record = payload
+                if payload is not None and not is_cached:
+                    if not (payload.get("eventBaseLineKPIs") or payload.get("eventBaselineKPIs")):
+                        warnings.append(f"No KPIs found for project {payload.get('id')}")
+                    start = time.perf_counter()
+                    record = normalize_project(payload)
+                    tracer.record("normalize", time.perf_counter() - start, start=start)
+                    fetched[str(eid)] = record
+                if not put(norm_q, (eid, record)):
+                    return
+                count("normalize")
+            if cache is not None and not stop.is_set():
+                cache.set_many(fetched)
+        except Exception as e:
+            fail(e)
+        finally:
+            for _ in range(translate_workers):
+                put(norm_q, _DONE)
+
+    def translate_stage():
+        try:
+            done = False
+            while not done:
+                # Gom các record đang chờ thành một lô để dịch chung (dedupe + ít request hơn)
+                batch = []
+                item = get(norm_q)
+                while item is not _DONE:
+                    batch.append(item)
+                    if len(batch) >= translate_batch:
+                        break
+                    try:
+                        item = norm_q.get_nowait()
+                    except queue.Empty:
+                        break
+                done = item is _DONE
+                if stop.is_set():
+                    return
+
+                # Không dịch thì sheet VIE nhận nguyên văn ENG, như report trước đây khi dịch lỗi
+                translations = {}
+                if translator is not None:
+                    # Project không đổi so với report cũ thì giữ bản dịch đã có, không dịch lại
+                    translations = translator.translate_many(
+                        value for eid, record in batch
+                        if record and any(sink.needs_update(record) for sink in sinks_by_id.get(eid, []))
+                        for value in row_values(record)
+                    )
+                for eid, record in batch:
+                    if not put(write_q, (eid, record, translations)):
+                        return
+                    count("translate")
+        except Exception as e:
+            fail(e)
+        finally:
+            put(write_q, _DONE)
+
+    threads = [threading.Thread(target=fetch_stage, daemon=True),
+               threading.Thread(target=normalize_stage, daemon=True)]
+    threads += [threading.Thread(target=translate_stage, daemon=True) for _ in range(translate_workers)]
+    for thread in threads:
+        thread.start()
+
+    def report():
+        while warnings and on_warning:
+            on_warning(warnings.pop(0))
+        if on_progress:
+            with counts_lock:
+                snapshot = dict(counts)
+            on_progress(snapshot, total)
+
+    # Stage write chạy trên thread hiện tại
+    records = {}
+    finished = 0
+    try:
+        while finished < translate_workers and not stop.is_set():
+            try:
+                item = write_q.get(timeout=0.2)
+            except queue.Empty:
+                report()
+                continue
+            if item is _DONE:
+                finished += 1
+                continue
+            eid, record, translations = item
+            if record:
+                records[str(eid)] = record
+            for sink in sinks_by_id.get(eid, []):
+                sink.add(eid, record, translations)
+            count("write")
+            report()
+    finally:
+        # Xong hoặc lỗi (kể cả rerun của Streamlit): báo các stage dừng rồi chờ có giới hạn,
+        # thread còn kẹt trong request mạng là daemon nên không giữ tiến trình lại
+        stop.set()
+        deadline = time.monotonic() + JOIN_TIMEOUT
+        for thread in threads:
+            thread.join(timeout=max(0.0, deadline - time.monotonic()))
+
+    report()
+    if errors:
+        raise errors[0]
+
+    files = {report_filename(year, month): sink.finish() for (year, month), sink in sinks.items()}
+    tracer.record("pipeline", time.perf_counter() - pipeline_start, start=pipeline_start,
+                  projects=total, reports=len(files))
+    return files, records
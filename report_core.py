@@ -0,0 +1,222 @@
+"""Pipeline tạo R&D report không phụ thuộc Streamlit: load -> filter -> fetch -> transform -> translate -> write.
+
+Chạy headless:
+    python -m report_core --master "Lean KPI Dashboard_Master Data.xlsx" \
+        --template "R&D Report_Template for LEAN.xlsx" --period 2024-05 \
+        --token "$EKAIZEN_TOKEN" --cookie "$EKAIZEN_COOKIE"
+
+Cập nhật report đã có (chỉ dịch và ghi các project mới hoặc đã đổi):
+    python -m report_core ... --update "R&D Report_Template for LEAN (May.2024).xlsx"
+"""
+import argparse
+import os
+import shutil
+import sys
+
+from disk_cache import project_cache, translation_memory
+from ekaizen_client import BASE_URL, EkaizenClient
+from instrumentation import NULL_TRACER, Tracer
+from master_data import (COLUMN_ALIASES, PeriodIndex, file_hash, load_master_data,
+                         month_range, read_header, resolve_columns)
+from normalize import PROJECT_FIELDS, normalize_project
+from pipeline import stream_reports
+from report_writer import (YEAR_COLUMN, report_filename, report_period, row_values, write_report,
+                           zip_reports)
+from translation import GoogleBackend, TranslationService
+
+
+def load_master(data, digest=None, engine="auto", tracer=None):
+    """Đọc Master Data từ bytes; trả về (df, col_names). Thiếu cột bắt buộc -> ValueError."""
+    columns = read_header(data)
+    col_names = resolve_columns(columns)
+    missing = [COLUMN_ALIASES[key][0] for key, col in col_names.items() if not col]
+    if missing:
+        raise ValueError(f"Cannot find column(s): {', '.join(missing)}")
+    df, _ = load_master_data(data, col_names, columns, engine=engine, digest=digest or file_hash(data),
+                             tracer=tracer)
+    return df, col_names
+
+
+def select_projects(df, col_names, period_index, periods, min_saving=1500, tracer=None):
+    """Trả về (project_ids không trùng, dict (năm, tháng) -> project_ids của kỳ đó)."""
+    project_id_col = col_names['project_id']
+    period_project_ids = {}
+    with (tracer or NULL_TRACER).span("filter", periods=len(periods)) as span:
+        for year, month in periods:
+            filtered = df.iloc[period_index.positions(year, month, min_saving)]
+            period_project_ids[(year, month)] = filtered[project_id_col].dropna().astype(int).tolist()
+        project_ids = list(dict.fromkeys(eid for ids in period_project_ids.values() for eid in ids))
+        span["projects"] = len(project_ids)
+    return project_ids, period_project_ids
+
+
+def fetch_records(project_ids, client, cache=None, force_refresh=False,
+                  on_progress=None, on_warning=None):
+    """Lấy record đã chuẩn hoá cho từng project: cache trước, chỉ fetch những ID còn thiếu.
+
+    Trả về dict str(project_id) -> record (chưa có cột Năm).
+    """
+    records = {}
+    if cache is not None and not force_refresh:
+        records = cache.get_many(project_ids)
+    missing = [eid for eid in project_ids if str(eid) not in records]
+    if not missing:
+        return records
+
+    fetched = {}
+    for result in client.fetch_projects(missing, on_progress=on_progress):
+        if result.error:
+            if on_warning:
+                on_warning(f"Error fetching project {result.eid}: {result.error}")
+            continue
+        p = result.project
+        if on_warning and not (p.get("eventBaseLineKPIs") or p.get("eventBaselineKPIs")):
+            on_warning(f"No KPIs found for project {p.get('id')}")
+        fetched[str(result.eid)] = normalize_project(p)
+
+    if cache is not None:
+        cache.set_many(fetched)
+    records.update(fetched)
+    return records
+
+
+def build_reports(records, period_project_ids):
+    """Dựng các dòng report cho từng kỳ: dict (năm, tháng) -> list record có cột Năm."""
+    reports = {}
+    for (year, month), ids in period_project_ids.items():
+        reports[(year, month)] = [
+            {**records[str(eid)], YEAR_COLUMN: year}
+            for eid in ids if str(eid) in records
+        ]
+    return reports
+
+
+def translate_reports(reports, translator, on_progress=None):
+    """Dịch một lần toàn bộ chuỗi unique của mọi kỳ; trả về dict ENG -> VIE."""
+    return translator.translate_many(
+        (value for details in reports.values() for record in details for value in row_values(record)),
+        on_progress=on_progress
+    )
+
+
+def write_reports(template, reports, translations=None):
+    """Trả về dict tên file -> file xlsx tạm, mỗi kỳ một file từ bản sao của template."""
+    return {
+        report_filename(year, month): write_report(template, details, translations)
+        for (year, month), details in reports.items()
+    }
+
+
+def existing_reports(reports, on_warning=None):
+    """reports: dict tên file -> bytes của report đã tạo; trả về dict (năm, tháng) -> bytes để cập nhật."""
+    existing = {}
+    for filename, data in reports.items():
+        period = report_period(data, filename)
+        if period is None:
+            if on_warning:
+                on_warning(f"Cannot tell which month {filename} covers; it will not be updated")
+            continue
+        existing[period] = data
+    return existing
+
+
+def generate_reports(master, template, periods, client, translator=None, cache=None,
+                     min_saving=1500, force_refresh=False, on_progress=None, on_warning=None,
+                     engine="auto", existing=None, tracer=None):
+    """Chạy toàn bộ pipeline; master/template là bytes. Trả về dict tên file -> file xlsx tạm.
+
+    Fetch, dịch và ghi chạy chồng lấn nhau (xem pipeline.stream_reports).
+    existing: dict (năm, tháng) -> bytes của report cũ cần cập nhật (xem existing_reports).
+    """
+    df, col_names = load_master(master, engine=engine, tracer=tracer)
+    _, period_project_ids = select_projects(df, col_names, PeriodIndex(df, col_names),
+                                            periods, min_saving, tracer=tracer)
+    files, _ = stream_reports(template, period_project_ids, client, translator=translator, cache=cache,
+                              force_refresh=force_refresh, on_progress=on_progress, on_warning=on_warning,
+                              existing=existing, tracer=tracer)
+    return files
+
+
+def _parse_period(value):
+    year, month = value.split("-")
+    return int(year), int(month)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m report_core", description="Generate R&D reports without the Streamlit UI.")
+    parser.add_argument("--master", required=True, help="Lean KPI Dashboard_Master Data.xlsx")
+    parser.add_argument("--template", required=True, help="R&D Report_Template for LEAN.xlsx")
+    parser.add_argument("--period", required=True, type=_parse_period, help="First period, YYYY-MM")
+    parser.add_argument("--to", type=_parse_period, help="Last period, YYYY-MM (default: same as --period)")
+    parser.add_argument("--min-saving", type=float, default=1500)
+    parser.add_argument("--token", default=os.environ.get("EKAIZEN_TOKEN"), help="Bearer token (default: $EKAIZEN_TOKEN)")
+    parser.add_argument("--cookie", default=os.environ.get("EKAIZEN_COOKIE"), help="Cookie (default: $EKAIZEN_COOKIE)")
+    parser.add_argument("--base-url", default=BASE_URL, help="ekaizen OData root")
+    parser.add_argument("-o", "--output-dir", default=".")
+    parser.add_argument("--zip", help="Also bundle all reports into this zip file")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--rate-limit", type=float, default=10.0)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--full-payload", action="store_true",
+                        help="Download whole Project entities instead of only the fields the report uses")
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--force-refresh", action="store_true")
+    parser.add_argument("--no-translate", action="store_true",
+                        help="Skip Google Translate; the VIE sheet gets the English text")
+    parser.add_argument("--update", nargs="+", metavar="REPORT",
+                        help="Previously generated report(s) to update in place of a fresh template copy")
+    parser.add_argument("--trace", help="Write per-stage timings to this .json or .csv file")
+    args = parser.parse_args(argv)
+
+    if not args.token or not args.cookie:
+        parser.error("API credentials required (--token/--cookie or EKAIZEN_TOKEN/EKAIZEN_COOKIE)")
+    periods = month_range(args.period, args.to or args.period)
+    if not periods:
+        parser.error("--to must not be before --period")
+
+    with open(args.master, "rb") as f:
+        master = f.read()
+    with open(args.template, "rb") as f:
+        template = f.read()
+    warn = lambda message: print(f"warning: {message}", file=sys.stderr)
+    existing = {}
+    for path in args.update or ():
+        with open(path, "rb") as f:
+            existing.update(existing_reports({os.path.basename(path): f.read()}, on_warning=warn))
+
+    tracer = Tracer()
+    cache = None if args.no_cache else project_cache()
+    translator = None if args.no_translate else TranslationService(GoogleBackend(source='en', target='vi'),
+                                                                   memory=translation_memory(), tracer=tracer)
+
+    with EkaizenClient(args.token, args.cookie, max_workers=args.workers, rate_limit=args.rate_limit,
+                       batch_size=args.batch_size, base_url=args.base_url,
+                       fields=None if args.full_payload else PROJECT_FIELDS, tracer=tracer) as client:
+        files = generate_reports(master, template, periods, client, translator=translator, cache=cache,
+                                 min_saving=args.min_saving, force_refresh=args.force_refresh, on_warning=warn,
+                                 existing=existing, tracer=tracer)
+
+    for event in tracer.events:
+        if event["stage"] == "workbook_save" and "added" in event:
+            print(f"updated: {event['added']} added, {event['replaced']} replaced, "
+                  f"{event['unchanged']} unchanged", file=sys.stderr)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    for filename, content in files.items():
+        path = os.path.join(args.output_dir, filename)
+        with open(path, "wb") as f:
+            shutil.copyfileobj(content, f)
+        print(path)
+    if args.zip:
+        with open(args.zip, "wb") as f, zip_reports(files) as archive:
+            shutil.copyfileobj(archive, f)
+        print(args.zip)
+    if args.trace:
+        with open(args.trace, "w", encoding="utf-8", newline="") as f:
+            f.write(tracer.to_csv() if args.trace.endswith(".csv") else tracer.to_json())
+        print(args.trace)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,247 @@
+import hashlib
+import re
+import shutil
+import tempfile
+import time
+import zipfile
+from datetime import datetime
+from io import BytesIO
+
+from instrumentation import NULL_TRACER
+from normalize import parse_closed_date
+
+START_ROW = 5
+
+# Thứ tự cột A..H trong sheet ENG/VIE
+REPORT_COLUMNS = [
+    "Mã dự án\n(Project code)",
+    "Ngày dự án\n(Project date)",
+    "Tên dự án\n(Project name)",
+    "Quản lý dự án\n(Project lead)",
+    "Thời gian thực hiện dự án\n(Project timeline)",
+    "Trước cải tiến\n(Before improvement)",
+    "Sau cải tiến\n(After improvement)",
+    "Năm\n(Year)",
+]
+YEAR_COLUMN = REPORT_COLUMNS[-1]
+# Timeline sinh ngẫu nhiên nên không tính vào hash và được giữ nguyên khi cập nhật dòng
+TIMELINE_INDEX = 4
+
+# Sheet ẩn lưu kỳ của report (B1) và hash nội dung từng project (từ dòng 3) để cập nhật lần sau
+META_SHEET = "_rdmeta"
+META_START_ROW = 3
+
+# Ngày dự án ghi thành ô ngày Excel, hiển thị như 03-May-2024
+DATE_FORMAT = "dd-mmm-yyyy"
+# Report tạo trước khi có META_SHEET ghi ngày dự án thành chuỗi theo định dạng này
+LEGACY_DATE_FORMAT = "%d-%b-%Y"
+
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun",
+          "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+
+def report_filename(year, month):
+    return f"R&D Report_Template for LEAN ({MONTHS[month - 1]}.{year}).xlsx"
+
+
+def row_values(record):
+    """Giá trị 8 cột A..H của một dòng ENG; ngày dự án là datetime (record cũ có thể còn là chuỗi)."""
+    values = [record.get(key) for key in REPORT_COLUMNS]
+    if isinstance(values[1], str):
+        values[1] = parse_closed_date(values[1]) or values[1]
+    elif not values[1]:
+        values[1] = ""
+    return values
+
+
+def _hash_date(value):
+    """Ngày dự án chỉ so theo ngày: report cũ ghi chuỗi 03-May-2024, record fetch về có cả giờ."""
+    if isinstance(value, str):
+        try:
+            value = datetime.strptime(value, LEGACY_DATE_FORMAT)
+        except ValueError:
+            value = parse_closed_date(value) or value
+    return value.date() if isinstance(value, datetime) else value
+
+
+def row_hash(values):
+    """Hash nội dung 8 cột của một dòng (bỏ cột Timeline); ô trống và "" coi như nhau."""
+    values = list(values)
+    values[1] = _hash_date(values[1])
+    content = "\x1f".join("" if value is None else str(value)
+                          for i, value in enumerate(values) if i != TIMELINE_INDEX)
+    return hashlib.blake2b(content.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def report_period(report, filename=None):
+    """(year, month) của một report đã tạo: đọc từ sheet META_SHEET, nếu không có thì theo tên file."""
+    from openpyxl import load_workbook
+    wb = load_workbook(BytesIO(report), read_only=True)
+    try:
+        if META_SHEET in wb.sheetnames:
+            value = wb[META_SHEET]["B1"].value
+            if value:
+                year, month = str(value).split("-")
+                return int(year), int(month)
+    finally:
+        wb.close()
+    match = re.search(r"\((\w{3})\.(\d{4})\)", filename or "")
+    if match and match.group(1) in MONTHS:
+        return int(match.group(2)), MONTHS.index(match.group(1)) + 1
+    return None
+
+
+class ReportWorkbook:
+    """Một bản sao của template được điền vào ENG (và VIE nếu có).
+
+    Ô được địa chỉ hoá bằng số dòng/cột; mỗi record ghi ENG và VIE trong cùng một vòng lặp.
+    update=True: template là report đã tạo trước đó; upsert() chỉ thêm/thay các dòng mới hoặc đã đổi.
+    """
+
+    def __init__(self, template, tracer=None, update=False, period=None):
+        # openpyxl nặng (~150 ms) nên chỉ import khi thật sự ghi report
+        from openpyxl import load_workbook
+        self.tracer = tracer or NULL_TRACER
+        with self.tracer.span("template_load", bytes=len(template)):
+            self.wb = load_workbook(BytesIO(template))
+        self.eng = self.wb["ENG"]
+        self.vie = self.wb["VIE"] if "VIE" in self.wb.sheetnames else None
+        self.update = update
+        self.period = period
+        self.rows = 0
+        self.index = {}   # mã dự án -> dòng trong ENG
+        self.hashes = {}  # mã dự án -> row_hash, ghi vào META_SHEET khi save
+        self.stats = dict.fromkeys(("added", "replaced", "unchanged"), 0)
+        if update:
+            self._read_existing()
+        # Bản chụp lúc mở file, chỉ đọc nên needs_update() gọi được từ thread khác
+        self.stored = dict(self.hashes)
+
+    def _read_existing(self):
+        last = START_ROW - 1
+        rows = self.eng.iter_rows(min_row=START_ROW, max_col=len(REPORT_COLUMNS), values_only=True)
+        for row, values in enumerate(rows, start=START_ROW):
+            if values[0] is None:
+                continue
+            last = row
+            self.index[str(values[0])] = row
+            self.hashes[str(values[0])] = row_hash(values)
+        self.rows = last - START_ROW + 1
+
+        # Hash lưu từ lần trước là hash của record gốc, ưu tiên hơn hash tính lại từ ô (có thể đã bị sửa tay)
+        if META_SHEET in self.wb.sheetnames:
+            meta = self.wb[META_SHEET]
+            for code, digest in meta.iter_rows(min_row=META_START_ROW, max_col=2, values_only=True):
+                if code is not None and str(code) in self.index and digest:
+                    self.hashes[str(code)] = digest
+
+    def needs_update(self, record):
+        """True nếu record chưa có trong report hoặc nội dung đã khác lần ghi trước."""
+        values = row_values(record)
+        return self.stored.get(str(values[0])) != row_hash(values)
+
+    def append(self, record, translations=None):
+        """Ghi record vào dòng tiếp theo; translations: dict chuỗi ENG -> VIE cho sheet VIE."""
+        self.extend((record,), translations)
+
+    def extend(self, records, translations=None):
+        """Ghi nhiều record liên tiếp trong một lượt."""
+        start = time.perf_counter()
+        self.write_rows((row_values(record) for record in records), translations)
+        self.tracer.record("write_row", time.perf_counter() - start, start=start)
+
+    def upsert(self, record, translations=None):
+        """Thêm record nếu mã dự án chưa có, thay dòng cũ nếu nội dung đã đổi, còn lại giữ nguyên."""
+        values = row_values(record)
+        code = str(values[0])
+        digest = row_hash(values)
+        row = self.index.get(code)
+        if row is None:
+            self.append(record, translations)
+            self.stats["added"] += 1
+        elif self.hashes.get(code) == digest:
+            self.stats["unchanged"] += 1
+        else:
+            start = time.perf_counter()
+            # Giữ Timeline cũ trên cả ENG và VIE (VIE là bản đã dịch)
+            self._write_row(row, values, translations, skip=(TIMELINE_INDEX,))
+            self.hashes[code] = digest
+            self.stats["replaced"] += 1
+            self.tracer.record("write_row", time.perf_counter() - start, start=start)
+
+    def write_rows(self, rows, translations=None):
+        """rows: các list giá trị theo thứ tự REPORT_COLUMNS, ghi từ dòng tiếp theo."""
+        row = START_ROW + self.rows
+        for values in rows:
+            self._write_row(row, values, translations)
+            code = str(values[0])
+            self.index[code] = row
+            self.hashes[code] = row_hash(values)
+            row += 1
+        self.rows = row - START_ROW
+
+    def _write_row(self, row, values, translations, skip=()):
+        """skip: vị trí (0-based) các cột giữ nguyên giá trị cũ trên cả ENG và VIE."""
+        vie_cell = self.vie.cell if self.vie is not None and translations is not None else None
+        for column, value in enumerate(values, start=1):
+            if column - 1 in skip:
+                continue
+            # Gán .value thay vì cell(value=...) để None cũng xoá được ô cũ
+            cell = self.eng.cell(row=row, column=column)
+            cell.value = value
+            if vie_cell is not None:
+                vie = vie_cell(row=row, column=column)
+                vie.value = translations.get(value, value) if isinstance(value, str) else value
+            if isinstance(value, datetime):
+                cell.number_format = DATE_FORMAT
+                if vie_cell is not None:
+                    vie.number_format = DATE_FORMAT
+
+    def _period_text(self):
+        return f"{self.period[0]}-{self.period[1]:02d}" if self.period else None
+
+    def _write_meta(self):
+        if META_SHEET in self.wb.sheetnames:
+            del self.wb[META_SHEET]
+        meta = self.wb.create_sheet(META_SHEET)
+        meta.sheet_state = "hidden"
+        meta.append(("period", self._period_text()))
+        meta.append(("project_code", "hash"))
+        for code, digest in self.hashes.items():
+            meta.append((code, digest))
+
+    def save(self):
+        """Lưu ra file tạm (không giữ thêm bản sao trong RAM), trả về file đã seek(0)."""
+        fields = {"rows": self.rows}
+        if self.update:
+            fields.update(self.stats, period=self._period_text())
+        with self.tracer.span("workbook_save", **fields) as span:
+            self._write_meta()
+            output = tempfile.TemporaryFile()
+            self.wb.save(output)
+            span["bytes"] = output.tell()
+            output.seek(0)
+        return output
+
+
+def write_report(template, details, translations=None, tracer=None):
+    """Điền details vào một bản sao của template (bytes), trả về file tạm chứa xlsx.
+
+    translations: dict chuỗi ENG -> VIE; nếu template có sheet VIE thì điền bản dịch vào đó.
+    """
+    report = ReportWorkbook(template, tracer=tracer)
+    report.extend(details, translations)
+    return report.save()
+
+
+def zip_reports(files):
+    """files: dict tên file -> file xlsx (đọc được); trả về file tạm chứa file zip."""
+    output = tempfile.TemporaryFile()
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as zf:
+        for filename, content in files.items():
+            content.seek(0)
+            with zf.open(filename, "w") as entry:
+                shutil.copyfileobj(content, entry)
+            content.seek(0)
+    output.seek(0)
+    return output
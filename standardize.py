@@ -1,13 +1,15 @@
 import streamlit as st
 import pandas as pd
-import requests
-import re
 from datetime import datetime
-from io import BytesIO
-import openpyxl
-from openpyxl import load_workbook
-import random
-from deep_translator import GoogleTranslator
+from ekaizen_client import EkaizenClient, make_session
+from normalize import PROJECT_FIELDS
+from disk_cache import project_cache, translation_memory
+from translation import GoogleBackend, TranslationService
+from master_data import file_hash, read_header, resolve_columns, read_preview, month_range, MasterDataStore
+from report_writer import MONTHS, YEAR_COLUMN, zip_reports
+from report_core import existing_reports, select_projects
+from pipeline import STAGES, stream_reports
+from instrumentation import Tracer
 
 # Cấu hình trang
 st.set_page_config(page_title="R&D Report Generator", layout="wide", page_icon="📊")
@@ -32,38 +34,109 @@ st.markdown("""
 
 st.markdown("<h1 class='main-header'>📊 R&D Report Generator</h1>", unsafe_allow_html=True)
 
+# Cache theo hash của file upload -> không parse lại Excel mỗi lần Streamlit rerun
+@st.cache_data(max_entries=8, show_spinner=False)
+def cached_header(digest, _data):
+    return read_header(_data)
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def cached_preview(digest, _data):
+    return read_preview(_data)
+
+# Dùng chung giữa các lần rerun và các session: Master Data đã nén (mỗi file một bản),
+# connection pool HTTP và backend dịch
+@st.cache_resource(show_spinner=False)
+def master_store():
+    return MasterDataStore(max_files=4)
+
+@st.cache_resource(show_spinner=False)
+def http_session(pool_size):
+    return make_session(pool_size)
+
+@st.cache_resource(show_spinner=False)
+def translation_backend():
+    return GoogleBackend(source='en', target='vi')
+
 # Khởi tạo session state
 if 'project_ids' not in st.session_state:
     st.session_state.project_ids = []
-if 'master_data' not in st.session_state:
-    st.session_state.master_data = None
-if 'col_names' not in st.session_state:
-    st.session_state.col_names = {}
+# Session chỉ giữ hash của file Master Data; frame và period index nằm trong master_store()
+if 'master_digest' not in st.session_state:
+    st.session_state.master_digest = None
+if 'period_project_ids' not in st.session_state:
+    st.session_state.period_project_ids = {}
+# Tracer sống suốt session (mỗi lần chạy lại Step 2 thêm event) nên chỉ giữ các event gần nhất
+if 'tracer' not in st.session_state:
+    st.session_state.tracer = Tracer(max_events=20000)
+tracer = st.session_state.tracer
+# False giữa các lần chạy cả app -> fragment biết mình đang chạy lại riêng (xem share_state)
+st.session_state.app_running = True
+
+def share_state(key, value):
+    """Lưu value vào session_state; nếu đổi trong lần chạy lại riêng của một fragment thì rerun cả app
+    để các tab khác thấy giá trị mới."""
+    changed = st.session_state.get(key) != value
+    st.session_state[key] = value
+    if changed and not st.session_state.app_running:
+        st.rerun()
 
 # Sidebar - Configuration
 with st.sidebar:
     st.header("🔧 Configuration")
     
+    report_mode = st.radio("Report mode", ["Single month", "Period range"], horizontal=True)
+    
     # Chọn tháng và năm
     col1, col2 = st.columns(2)
     with col1:
-        month = st.selectbox("Month", 
-                            ["Jan", "Feb", "Mar", "Apr", "May", "Jun", 
-                             "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"],
-                            index=datetime.now().month - 1)
+        month = st.selectbox("Month", MONTHS, index=datetime.now().month - 1)
     with col2:
         year = st.number_input("Year", min_value=2020, max_value=2030, 
                               value=datetime.now().year)
     
+    # Chế độ nhiều kỳ: mỗi tháng trong khoảng ra một report riêng, đóng gói thành zip
+    if report_mode == "Period range":
+        col1, col2 = st.columns(2)
+        with col1:
+            to_month = st.selectbox("To Month", MONTHS, index=datetime.now().month - 1)
+        with col2:
+            to_year = st.number_input("To Year", min_value=2020, max_value=2030,
+                                      value=datetime.now().year)
+    else:
+        to_month, to_year = month, year
+    
+    periods = month_range((year, MONTHS.index(month) + 1), (to_year, MONTHS.index(to_month) + 1))
+    period_label = f"{month} {year}" if len(periods) == 1 else f"{month} {year} → {to_month} {to_year}"
+    if not periods:
+        st.error("'To' period must not be before the start period")
+    
+    min_saving = st.number_input("Min Hard Saving ($)", min_value=0, value=1500, step=100)
+    
     st.divider()
     st.subheader("📁 Data Source")
     use_manual_upload = st.checkbox("Upload Master Data manually", value=True)
+    
+    st.divider()
+    st.subheader("💾 Project Cache")
+    use_cache = st.checkbox("Use local project cache", value=True)
+    cache_ttl_days = st.number_input("Cache TTL (days)", min_value=1, max_value=365, value=30)
+    cache_max_entries = st.number_input("Max cached projects", min_value=100, max_value=100000, value=5000, step=100)
+    force_refresh = st.checkbox("Force refresh (ignore cache)", value=False)
+    
+    st.divider()
+    st.subheader("🌐 Translation")
+    translate_workers = st.number_input("Concurrent translation requests", min_value=1, max_value=16, value=4)
+    translation_memory_size = st.number_input("Translation memory size", min_value=1000, max_value=200000, value=20000, step=1000)
 
 # Main content
 tab1, tab2, tab3 = st.tabs(["📥 Load Data", "🔑 API Config", "📤 Generate Report"])
 
+# Mỗi tab là một fragment: bấm nút hay gõ vào một tab chỉ chạy lại tab đó,
+# không parse lại Excel, lọc lại dữ liệu hay vẽ lại các bảng ở tab khác
+
 # TAB 1: Load Master Data
-with tab1:
+@st.fragment
+def load_data_tab():
     st.header("Step 1: Load Master Data")
     
     if use_manual_upload:
@@ -74,78 +147,53 @@ with tab1:
         
         if uploaded_file:
             try:
-                # Đọc file Excel
-                df = pd.read_excel(uploaded_file, sheet_name="Data Consolidate", header=1)
-
-                df = df.dropna(how='all')
-
-                df.columns = df.columns.str.strip()
+                # Đọc header trước, chỉ parse các cột cần dùng
+                data = uploaded_file.getvalue()
+                digest = file_hash(data)
+                columns = cached_header(digest, data)
                 
                 # DEBUG: Hiển thị tên cột
                 with st.expander("🔍 View Column Names (Debug)"):
                     st.write("Available columns in your file:")
                     col_list = []
-                    for i, col in enumerate(df.columns):
+                    for i, col in enumerate(columns):
                         col_list.append(f"{i+1}. {repr(col)} (type: {type(col).__name__})")
                     st.code("\n".join(col_list))
                 
-                # Hàm tìm cột - XỬ LÝ TẤT CẢ KIỂU DỮ LIỆU
-                def find_column(df, possible_names):
-                    df_cols_lower = {}
-                    for col in df.columns:
-                        # Convert mọi kiểu dữ liệu sang string
-                        col_str = str(col).lower().strip()
-                        df_cols_lower[col_str] = col
-                    
-                    for name in possible_names:
-                        name_lower = name.lower().strip()
-                        if name_lower in df_cols_lower:
-                            return df_cols_lower[name_lower]
-                    return None
-                
                 # Tìm các cột cần thiết
-                closed_date_col = find_column(df, ['Closed Date', 'closed date', 'CloseDate', 'Close Date'])
-                hard_saving_col = find_column(df, ['Hard saving validated', 'Hard Saving Validated', 'HardSaving'])
-                project_id_col = find_column(df, ['Project ID', 'ProjectID', 'id', 'ID'])
+                col_names = resolve_columns(columns)
+                closed_date_col = col_names['closed_date']
+                hard_saving_col = col_names['hard_saving']
+                project_id_col = col_names['project_id']
                 
                 # Kiểm tra các cột có tồn tại
                 if not closed_date_col:
                     st.error("❌ Cannot find 'Closed Date' column. Check column names above!")
-                    st.stop()
+                    return
                 
                 if not hard_saving_col:
                     st.error("❌ Cannot find 'Hard saving validated' column. Check column names above!")
-                    st.stop()
+                    return
                     
                 if not project_id_col:
                     st.error("❌ Cannot find 'Project ID' column. Check column names above!")
-                    st.stop()
+                    return
                 
                 st.info(f"✅ Detected columns:\n- Closed Date: `{closed_date_col}`\n- Hard Saving: `{hard_saving_col}`\n- Project ID: `{project_id_col}`")
                 
-                # Clean và convert data
-                df[closed_date_col] = pd.to_datetime(df[closed_date_col], 
-                                                     format='mixed', 
-                                                     dayfirst=True,
-                                                     errors='coerce')
-                
-                df[hard_saving_col] = df[hard_saving_col].astype(str).str.replace('$', '', regex=False)
-                df[hard_saving_col] = df[hard_saving_col].str.replace(',', '', regex=False)
-                df[hard_saving_col] = df[hard_saving_col].str.strip()
-                df[hard_saving_col] = pd.to_numeric(df[hard_saving_col], errors='coerce').fillna(0)
-                
-                # Lưu vào session state
-                st.session_state.master_data = df
-                st.session_state.col_names = {
-                    'closed_date': closed_date_col,
-                    'hard_saving': hard_saving_col,
-                    'project_id': project_id_col
-                }
+                # Index (năm, tháng) dựng một lần khi load, dùng cho mọi lần lọc sau
+                with st.spinner("Reading Master Data..."):
+                    entry = master_store().load(data, col_names, columns, digest=digest, tracer=tracer)
+                st.session_state.master_digest = digest
                 
-                st.success(f"✅ Loaded {len(df)} rows from Master Data")
+                st.success(f"✅ Loaded {len(entry.df)} rows from Master Data")
+                usage = master_store().memory_usage()
+                st.caption(f"Parsed {len(entry.df.columns)} of {len(columns)} columns with `{entry.backend}` · "
+                           f"{entry.nbytes / 2**20:.1f} MB in memory · shared store: {len(usage)} file(s), "
+                           f"{sum(u['bytes'] for u in usage) / 2**20:.1f} MB")
                 
                 with st.expander("Preview Data"):
-                    st.dataframe(df.head(10))
+                    st.dataframe(cached_preview(digest, data))
                 
             except Exception as e:
                 st.error(f"Error loading file: {str(e)}")
@@ -153,42 +201,34 @@ with tab1:
                 st.code(traceback.format_exc())
     
     # Tự động filter khi có data
-    if st.session_state.master_data is not None and st.session_state.col_names:
+    entry = master_store().get(st.session_state.master_digest) if st.session_state.master_digest else None
+    if st.session_state.master_digest and entry is None:
+        st.info("ℹ️ Master Data was dropped from the shared store to free memory. Please upload it again.")
+    if entry is not None:
         st.divider()
         st.header("Step 2: Filtered Projects")
         
-        df = st.session_state.master_data
-        
-        # Convert tháng text sang số
-        month_map = {
-            "Jan": 1, "Feb": 2, "Mar": 3, "Apr": 4, "May": 5, "Jun": 6,
-            "Jul": 7, "Aug": 8, "Sep": 9, "Oct": 10, "Nov": 11, "Dec": 12
-        }
-        selected_month_num = month_map[month]
-        
-        min_saving = 1500  # Default value
+        df = entry.df
         
         try:
             # Lấy tên cột đã detect
-            closed_date_col = st.session_state.col_names['closed_date']
-            hard_saving_col = st.session_state.col_names['hard_saving']
-            project_id_col = st.session_state.col_names['project_id']
+            closed_date_col = entry.col_names['closed_date']
+            hard_saving_col = entry.col_names['hard_saving']
+            project_id_col = entry.col_names['project_id']
             
-            # Filter data
-            filtered = df[
-                (df[closed_date_col].dt.month == selected_month_num) &
-                (df[closed_date_col].dt.year == year) &
-                (df[hard_saving_col] >= min_saving)
-            ].copy()
-            
-            # Lấy Project IDs
-            project_ids = filtered[project_id_col].dropna().astype(int).tolist()
-            st.session_state.project_ids = project_ids
+            # Filter data: lấy vị trí dòng từ period index thay vì quét cả frame
+            # Dự án trùng giữa các kỳ chỉ fetch/dịch một lần
+            period_index = entry.period_index
+            project_ids, period_project_ids = select_projects(df, entry.col_names,
+                                                              period_index, periods, min_saving, tracer=tracer)
+            st.session_state.period_project_ids = period_project_ids
+            # Tab Generate dùng danh sách project này
+            share_state("project_ids", project_ids)
             
             # Hiển thị metrics
             col1, col2, col3 = st.columns(3)
             with col1:
-                st.metric("📅 Period", f"{month} {year}")
+                st.metric("📅 Period", period_label)
             with col2:
                 st.metric("💰 Min Saving", f"${min_saving:,}")
             with col3:
@@ -197,11 +237,20 @@ with tab1:
             if len(project_ids) > 0:
                 st.success(f"✅ Found {len(project_ids)} projects matching criteria")
                 
+                if len(periods) > 1:
+                    st.dataframe(pd.DataFrame({
+                        "Period": [f"{MONTHS[m - 1]} {y}" for y, m in period_project_ids],
+                        "Projects": [len(ids) for ids in period_project_ids.values()],
+                    }), hide_index=True)
+                
                 # Hiển thị kết quả
                 col1, col2 = st.columns([2, 1])
                 with col1:
                     st.write("**Filtered Projects:**")
-                    display_df = filtered[[project_id_col, closed_date_col, hard_saving_col]].head(20)
+                    display_df = pd.concat(
+                        df[[project_id_col, closed_date_col, hard_saving_col]].iloc[period_index.positions(p_year, p_month, min_saving)]
+                        for p_year, p_month in periods
+                    ).head(20)
                     st.dataframe(display_df, use_container_width=True)
                 with col2:
                     st.write("**Project IDs:**")
@@ -209,15 +258,24 @@ with tab1:
                     if len(project_ids) > 20:
                         st.caption(f"...and {len(project_ids) - 20} more")
             else:
-                st.warning(f"⚠️ No projects found for {month} {year} with Hard Saving ≥ ${min_saving:,}")
+                st.warning(f"⚠️ No projects found for {period_label} with Hard Saving ≥ ${min_saving:,}")
+            
+            with st.expander("📆 All Periods Summary"):
+                summary = period_index.summary(min_saving)
+                summary.insert(0, "Period", [f"{MONTHS[m - 1]} {y}" for y, m in zip(summary["Year"], summary["Month"])])
+                st.dataframe(summary.drop(columns=["Year", "Month"]), use_container_width=True, hide_index=True)
                 
         except Exception as e:
             st.error(f"Error filtering data: {str(e)}")
             import traceback
             st.code(traceback.format_exc())
 
+with tab1:
+    load_data_tab()
+
 # TAB 2: API Configuration
-with tab2:
+@st.fragment
+def api_config_tab():
     st.header("Step 3: API Configuration")
     
     st.info("⚠️ Token expires after some time. Please update if needed.")
@@ -225,48 +283,66 @@ with tab2:
     authorization = st.text_area(
         "Authorization Bearer Token",
         height=150,
-        placeholder="Paste your Bearer token here..."
+        placeholder="Paste your Bearer token here...",
+        key="authorization"
     )
     
     cookie = st.text_area(
         "Cookie",
         height=150,
-        placeholder="Paste your Cookie string here..."
+        placeholder="Paste your Cookie string here...",
+        key="cookie"
     )
     
+    with st.expander("⚙️ Fetch Settings"):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            max_workers = st.number_input("Max concurrent requests", min_value=1, max_value=32, value=8, key="max_workers")
+        with col2:
+            st.number_input("Requests per second (0 = unlimited)", min_value=0.0, max_value=100.0, value=10.0, key="rate_limit")
+        with col3:
+            st.number_input("Max retries (429/5xx)", min_value=0, max_value=10, value=3, key="max_retries")
+        batch_size = st.number_input("Projects per request (1 = one request per project)",
+                                     min_value=1, max_value=200, value=50, key="batch_size")
+        st.checkbox("Request only the fields the report uses ($select)", value=True, key="projection",
+                    help="Smaller payloads; turn off if the server rejects the projection")
+    
+    # Tab Generate chỉ cần biết đã có đủ token/cookie hay chưa
+    share_state("credentials_ready", bool(authorization and cookie))
+    
     if authorization and cookie:
         st.success("✅ API credentials configured")
         
         # Test connection
         if st.button("🧪 Test API Connection"):
-            test_headers = {
-                "User-Agent": "Mozilla/5.0",
-                "Accept": "application/json, text/plain, */*",
-                "Authorization": f"Bearer {authorization}",
-                "Cookie": cookie,
-            }
-            
             if st.session_state.project_ids:
                 test_id = st.session_state.project_ids[0]
-                test_url = f"https://ekaizen.jblapps.com/api/odata/Project({test_id})?$count=true&$expand=teamLeader"
                 
                 with st.spinner("Testing..."):
-                    try:
-                        response = requests.get(test_url, headers=test_headers)
-                        if response.status_code == 200:
-                            st.success("✅ API connection successful!")
-                        else:
-                            st.error(f"❌ Error: Status {response.status_code}")
-                            st.code(response.text)
-                    except Exception as e:
-                        st.error(f"❌ Connection error: {str(e)}")
+                    # Dùng cùng code path với Generate Report
+                    with EkaizenClient(authorization, cookie, max_retries=0, batch_size=batch_size,
+                                       session=http_session(max_workers),
+                                       fields=PROJECT_FIELDS if st.session_state.projection else None) as client:
+                        result = client.fetch_projects([test_id])[0]
+                    if result.error:
+                        st.error(f"❌ Error: {result.error}")
+                    else:
+                        st.success("✅ API connection successful!")
             else:
                 st.warning("No project IDs to test. Please load and filter data first.")
 
+with tab2:
+    api_config_tab()
+
 # TAB 3: Generate Report
-with tab3:
+@st.fragment
+def generate_tab():
     st.header("Step 4: Generate Report")
     
+    # Token và cấu hình fetch lấy từ widget của tab API Config
+    authorization = st.session_state.authorization
+    cookie = st.session_state.cookie
+    
     can_generate = (
         st.session_state.project_ids and 
         authorization and 
@@ -287,161 +363,156 @@ with tab3:
             type=['xlsx']
         )
         
+        existing_files = st.file_uploader(
+            "Update Existing Report(s) (optional)",
+            type=['xlsx'],
+            accept_multiple_files=True,
+            help="Previously generated reports: only new or changed projects are translated and written, "
+                 "existing rows and translations are kept"
+        )
+        
         if st.button("🚀 Generate Report", type="primary", use_container_width=True):
             if not template_file:
                 st.error("Please upload template file first")
             else:
-                progress_bar = st.progress(0)
+                # Mỗi stage một thanh tiến độ; các stage chạy chồng lấn nhau
+                stage_bars = {stage: st.empty() for stage in STAGES}
                 status_text = st.empty()
                 
-                headers = {
-                    "User-Agent": "Mozilla/5.0",
-                    "Accept": "application/json, text/plain, */*",
-                    "Authorization": f"Bearer {authorization}",
-                    "Cookie": cookie,
-                }
-                
-                details = []
-                total = len(st.session_state.project_ids)
-                
-                for idx, eid in enumerate(st.session_state.project_ids):
-                    status_text.text(f"Fetching project {idx+1}/{total}: {eid}")
-                    progress_bar.progress((idx + 1) / total)
-                    
-                    url = f"https://ekaizen.jblapps.com/api/odata/Project({eid})?$count=true&$expand=teamLeader,eventBaseLineKPIs"
-                    
-                    try:
-                        response = requests.get(url, headers=headers)
-                        
-                        if response.status_code == 200:
-                            data = response.json()
-                            
-                            if data.get("value"):
-                                p = data["value"][0]
-                                
-                                def clean_string(s):
-                                    if not isinstance(s, str):
-                                        return s
-                                    return re.sub(r"[\x00-\x1F\x7F-\x9F]", "", s)
-                                
-                                random_months = f"{random.randint(1,7)} months"
-
-                                before_text = clean_string(p.get("projectStatement", ""))
-
-                                kpis = p.get("eventBaseLineKPIs") or p.get("eventBaselineKPIs") or []
-                                after_texts = []
-
-                                if not kpis:
-                                    after_text = "N/A"
-                                    st.write(f"Raw KPIs for project {p.get('id')}: ", kpis)
-                                else:
-                                    for k in kpis:
-                                        name = k.get("kpiName") or k.get("name") or ""
-                                        base = k.get("baseLineKPIValue") or k.get("baseline") or ""
-                                        actual = k.get("actualKPIValue") or k.get("actual") or ""
-                                        if name:
-                                            after_texts.append(f"{name}: Baseline={base}, Actual={actual}")
-                                    after_text = "\n".join(after_texts) if after_texts else "N/A"
-
-                                closed_date_raw = p.get("closedDate")
-                                formatted_date = ""
-                                if closed_date_raw:
-                                    try:
-                                        dt = datetime.strptime(closed_date_raw, "%Y-%m-%dT%H:%M:%S.%fZ")
-                                    except:
-                                        try:
-                                            dt = datetime.strptime(closed_date_raw.split("T")[0], "%Y-%m-%d")
-                                        except:
-                                            dt = None
-                                    if dt: 
-                                            try:
-                                                formatted_date = dt.strftime("%#d-%b-%y")
-                                            except:
-                                                formatted_date = dt.strftime("%-d-%b-%y")
-                                
-                                details.append({
-                                    "Mã dự án\n(Project code)": p.get("id"),
-                                    "Ngày dự án\n(Project date)": p.get("closedDate"),
-                                    "Tên dự án\n(Project name)": clean_string(p.get("name")),
-                                    "Quản lý dự án\n(Project lead)": p.get("teamLeader", {}).get("name"),
-                                    "Thời gian thực hiện dự án\n(Project timeline)": random_months,
-                                    "Trước cải tiến\n(Before improvement)": before_text,
-                                    "Sau cải tiến\n(After improvement)": after_text,
-                                    "Năm\n(Year)": year,
-                                })
-                    except Exception as e:
-                        st.warning(f"Error fetching project {eid}: {str(e)}")
+                def show_progress(counts, total):
+                    for stage, bar in stage_bars.items():
+                        bar.progress(counts[stage] / total, text=f"{stage.title()}: {counts[stage]}/{total}")
                 
-                status_text.text("✅ Data fetching complete!")
-                progress_bar.progress(1.0)
+                cache = project_cache(ttl=cache_ttl_days * 86400, max_entries=cache_max_entries) if use_cache else None
+                translator = TranslationService(translation_backend(),
+                                                memory=translation_memory(max_entries=translation_memory_size),
+                                                max_workers=translate_workers, tracer=tracer)
                 
                 try:
-                    wb = load_workbook(template_file)
-                    ws = wb["ENG"]
+                    template = template_file.getvalue()
+                    existing = existing_reports({f.name: f.getvalue() for f in existing_files or []},
+                                                on_warning=st.warning)
+                    for p_year, p_month in existing:
+                        if (p_year, p_month) not in st.session_state.period_project_ids:
+                            st.warning(f"⚠️ Existing report for {MONTHS[p_month - 1]}.{p_year} "
+                                       f"is outside the selected period(s) and was ignored")
+                    run_start = tracer.now()
                     
-                    start_row = 5
-                    for idx, record in enumerate(details):
-                        row = start_row + idx
-                        ws[f'A{row}'] = record["Mã dự án\n(Project code)"]
-                        closed_date_raw = record.get("Ngày dự án\n(Project date)")
-                        if closed_date_raw:
-                            try:
-                                dt = datetime.fromisoformat(closed_date_raw.replace("Z", ""))
-                                ws[f'B{row}'] = dt.strftime("%d-%b-%Y")
-                            except:
-                                ws[f'B{row}'] = closed_date_raw
-                        else:
-                            ws[f'B{row}'] = ""
-                        ws[f'C{row}'] = record["Tên dự án\n(Project name)"]
-                        ws[f'D{row}'] = record["Quản lý dự án\n(Project lead)"]
-                        ws[f'E{row}'] = record["Thời gian thực hiện dự án\n(Project timeline)"]
-                        ws[f'F{row}'] = record["Trước cải tiến\n(Before improvement)"]
-                        ws[f'G{row}'] = record["Sau cải tiến\n(After improvement)"]
-                        ws[f'H{row}'] = record["Năm\n(Year)"]
-
-                    if "VIE" in wb.sheetnames:
-                        eng_ws = wb["ENG"]
-                        vie_ws = wb["VIE"]
-                        translator = GoogleTranslator(source='en', target='vi')
-                        
-                        for row in eng_ws.iter_rows(min_row=5, max_row=5+len(details)-1, min_col=1, max_col=8):
-                            for cell in row:
-                                target = vie_ws[cell.coordinate]
-                                val = cell.value
-                                if isinstance(val, str):
-                                    try:
-                                        clean_val = re.sub(r"[\x00-\x1F\x7F-\x9F]", " ", val).strip()
-                                        if len(clean_val) > 4500:
-                                            clean_val = clean_val[:4500]
-                                        translated = translator.translate(clean_val)
-                                        target.value = translated
-                                        
-                                    except Exception as e:
-                                        target.value = val
-                                else:
-                                    target.value = val
+                    # Project lấy từ cache trước, chỉ fetch những project chưa có / hết hạn;
+                    # mỗi project được dịch và ghi ngay khi fetch xong
+                    max_workers = st.session_state.max_workers
+                    with EkaizenClient(authorization, cookie,
+                                       max_workers=max_workers,
+                                       rate_limit=st.session_state.rate_limit,
+                                       max_retries=st.session_state.max_retries,
+                                       batch_size=st.session_state.batch_size,
+                                       session=http_session(max_workers),
+                                       fields=PROJECT_FIELDS if st.session_state.projection else None,
+                                       tracer=tracer) as client:
+                        files, records = stream_reports(template, st.session_state.period_project_ids, client,
+                                                        translator=translator, cache=cache,
+                                                        force_refresh=force_refresh,
+                                                        translate_workers=translate_workers,
+                                                        on_progress=show_progress, on_warning=st.warning,
+                                                        existing=existing, tracer=tracer)
                     
-                    output = BytesIO()
-                    wb.save(output)
-                    output.seek(0)
+                    if cache:
+                        col1, col2 = st.columns(2)
+                        with col1:
+                            st.metric("💾 Cache hits", cache.hits)
+                        with col2:
+                            st.metric("🌐 Cache misses", cache.misses)
                     
-                    filename = f"R&D Report_Template for LEAN ({month}.{year}).xlsx"
+                    for event in list(tracer.events):
+                        if event["stage"] == "workbook_save" and "added" in event and event["start"] >= run_start:
+                            st.caption(f"🔁 Updated {event['period']}: {event['added']} added, "
+                                       f"{event['replaced']} replaced, {event['unchanged']} unchanged")
                     
-                    st.success(f"✅ Report generated with {len(details)} projects!")
+                    stats = translator.stats
+                    if stats["strings"]:
+                        st.caption(f"🌐 Translation: {stats['unique']} unique strings, "
+                                   f"{stats['memory_hits']} from memory, {stats['translated']} translated, "
+                                   f"{stats['failed']} failed")
                     
-                    st.download_button(
-                        label="📥 Download Report",
-                        data=output,
-                        file_name=filename,
-                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                    )
+                    all_details = [
+                        {**records[str(eid)], YEAR_COLUMN: p_year}
+                        for (p_year, p_month), ids in st.session_state.period_project_ids.items()
+                        for eid in ids if str(eid) in records
+                    ]
+                    
+                    if len(files) == 1:
+                        filename, output = next(iter(files.items()))
+                        st.success(f"✅ Report generated with {len(all_details)} projects!")
+                        st.download_button(
+                            label="📥 Download Report",
+                            data=output.read(),
+                            file_name=filename,
+                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                        )
+                    else:
+                        st.success(f"✅ {len(files)} reports generated from {len(records)} unique projects!")
+                        st.download_button(
+                            label="📥 Download Reports (ZIP)",
+                            data=zip_reports(files).read(),
+                            file_name=f"R&D Reports ({month}.{year}-{to_month}.{to_year}).zip",
+                            mime="application/zip"
+                        )
+                    status_text.text("✅ Done!")
                     
                     with st.expander("Preview Data"):
-                        st.dataframe(pd.DataFrame(details))
+                        st.dataframe(pd.DataFrame(all_details))
                     
                 except Exception as e:
                     st.error(f"Error generating report: {str(e)}")
 
+with tab3:
+    generate_tab()
+
+# Performance: thời gian từng stage của session hiện tại
+@st.fragment
+def performance_panel():
+    with st.expander("⏱️ Performance"):
+        stage_totals = tracer.stage_totals()
+        if not stage_totals:
+            st.caption("No timings recorded yet. Load data or generate a report first.")
+        else:
+            st.dataframe(pd.DataFrame(stage_totals), hide_index=True, use_container_width=True)
+            
+            http_percentiles = tracer.percentiles("http")
+            if http_percentiles:
+                st.write("**Fetch latency (ms)**")
+                cols = st.columns(len(http_percentiles) + 1)
+                cols[0].metric("Requests", tracer.counters.get("http_requests", 0))
+                for col, (name, value) in zip(cols[1:], http_percentiles.items()):
+                    col.metric(name, f"{value:,.0f}")
+                # Payload sau khi giải nén và số byte thật sự đi qua mạng (gzip/br)
+                payload = tracer.counters.get("http_bytes", 0)
+                wire = tracer.counters.get("http_wire_bytes", 0)
+                if payload:
+                    st.caption(f"📦 Payload: {payload / 1024:,.0f} KiB decoded, {wire / 1024:,.0f} KiB "
+                               f"transferred ({wire / payload:.0%})")
+                histogram = tracer.histogram("http")
+                st.bar_chart(pd.DataFrame(histogram, columns=["Latency", "Requests"]).set_index("Latency"))
+            
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.download_button("📥 Trace (JSON)", tracer.to_json(), file_name="rd_report_trace.json", mime="application/json")
+            with col2:
+                st.download_button("📥 Trace (CSV)", tracer.to_csv(), file_name="rd_report_trace.csv", mime="text/csv")
+            with col3:
+                if st.button("🗑️ Clear Trace"):
+                    tracer.clear()
+                    st.rerun(scope="fragment")
+            with col4:
+                # Generate Report chạy trong fragment của tab 3 nên bảng này không tự cập nhật
+                if st.button("🔄 Refresh"):
+                    st.rerun(scope="fragment")
+
+performance_panel()
+
 # Footer
 st.divider()
-st.caption("R&D Report Generator v1.0 | Made for Lean Team JVN")
\ No newline at end of file
+st.caption("R&D Report Generator v1.0 | Made for Lean Team JVN")
+
+# Hết lần chạy cả app (xem share_state)
+st.session_state.app_running = False
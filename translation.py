@@ -0,0 +1,149 @@
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from instrumentation import NULL_TRACER
+
+# Google Translate giới hạn ~5000 ký tự mỗi request
+MAX_CHARS = 4500
+
+_CONTROL_CHARS = re.compile(r"[\x00-\x1F\x7F-\x9F]")
+
+# Chuỗi chỉ gồm số / tiền / ngày tháng thì không cần dịch
+_NOT_TRANSLATABLE = re.compile(
+    r"^(?:"
+    r"[\d\s.,:;/%$+\-()]*"                               # 1,500 | 12.5% | 05/01/2024
+    r"|\d{1,2}[-\s][A-Za-z]{3}[-\s]\d{2,4}"              # 05-Jan-2024
+    r"|\d{4}-\d{2}-\d{2}(?:[T\s][\d:.]+Z?)?"             # 2024-01-05T00:00:00Z
+    r")$"
+)
+
+
+def prepare_text(text):
+    clean = _CONTROL_CHARS.sub(" ", text).strip()
+    return clean[:MAX_CHARS]
+
+
+def should_translate(value):
+    if not isinstance(value, str):
+        return False
+    clean = prepare_text(value)
+    return bool(clean) and not _NOT_TRANSLATABLE.match(clean)
+
+
+class GoogleBackend:
+    """Backend dùng deep_translator; mỗi thread một GoogleTranslator vì object này không thread-safe."""
+
+    def __init__(self, source="en", target="vi"):
+        self.source = source
+        self.target = target
+        self._local = threading.local()
+
+    def _translator(self):
+        if not hasattr(self._local, "translator"):
+            from deep_translator import GoogleTranslator
+            self._local.translator = GoogleTranslator(source=self.source, target=self.target)
+        return self._local.translator
+
+    def translate_batch(self, texts):
+        """Chuỗi nào dịch lỗi thì trả None ở vị trí đó, các chuỗi còn lại trong lô vẫn giữ."""
+        translator = self._translator()
+        results = []
+        for text in texts:
+            try:
+                results.append(translator.translate(text))
+            except Exception:
+                results.append(None)
+        return results
+
+
+class StubBackend:
+    """Backend giả để test/benchmark: thêm prefix, có thể mô phỏng độ trễ mỗi request."""
+
+    def __init__(self, prefix="[vi] ", delay=0.0):
+        self.prefix = prefix
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def translate_batch(self, texts):
+        with self._lock:
+            self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        return [self.prefix + text for text in texts]
+
+
+class TranslationService:
+    """Dịch theo lô: gom chuỗi unique, tra translation memory trước, phần còn lại gửi song song.
+
+    max_workers là số request dịch tối đa cùng lúc, tính chung cho mọi thread đang gọi translate_many.
+    """
+
+    def __init__(self, backend, memory=None, batch_size=20, max_workers=4, tracer=None):
+        self.backend = backend
+        self.memory = memory
+        self.batch_size = max(1, int(batch_size))
+        self.max_workers = max(1, int(max_workers))
+        self.tracer = tracer or NULL_TRACER
+        self.stats = {"strings": 0, "unique": 0, "memory_hits": 0, "translated": 0, "failed": 0}
+        # Bản dịch đã có trong lần chạy này, tránh tra SQLite lại cho chuỗi lặp (N/A, tên team leader...)
+        self._known = {}
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_workers)
+
+    def _translate_chunk(self, chunk):
+        with self._slots, self.tracer.span("translate_call", strings=len(chunk),
+                                           chars=sum(map(len, chunk))) as span:
+            try:
+                translated = self.backend.translate_batch(chunk)
+            except Exception as e:
+                span["error"] = str(e)
+                return {}
+        return {src: dst for src, dst in zip(chunk, translated) if dst}
+
+    def translate_many(self, values, on_progress=None):
+        """Trả về dict chuỗi gốc -> bản dịch; chuỗi dịch lỗi hoặc bị bỏ qua giữ nguyên.
+
+        on_progress(done, total) được gọi trên thread gọi hàm.
+        """
+        originals = [v for v in values if should_translate(v)]
+        prepared = {v: prepare_text(v) for v in dict.fromkeys(originals)}
+        unique = list(dict.fromkeys(prepared.values()))
+
+        translations = {text: self._known[text] for text in unique if text in self._known}
+        lookup = [text for text in unique if text not in translations]
+        if self.memory and lookup:
+            translations.update(self.memory.get_many(lookup))
+        todo = [text for text in unique if text not in translations]
+
+        chunks = [todo[i:i + self.batch_size] for i in range(0, len(todo), self.batch_size)]
+        fresh = {}
+        if len(chunks) == 1:
+            fresh = self._translate_chunk(chunks[0])
+            if on_progress:
+                on_progress(len(todo), len(todo))
+        elif chunks:
+            done = 0
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                futures = {pool.submit(self._translate_chunk, chunk): chunk for chunk in chunks}
+                for future in as_completed(futures):
+                    fresh.update(future.result())
+                    done += len(futures[future])
+                    if on_progress:
+                        on_progress(done, len(todo))
+
+        if self.memory:
+            self.memory.set_many(fresh)
+        translations.update(fresh)
+
+        with self._lock:
+            self._known.update(translations)
+            self.stats["strings"] += len(originals)
+            self.stats["unique"] += len(unique)
+            self.stats["memory_hits"] += len(unique) - len(todo)
+            self.stats["translated"] += len(fresh)
+            self.stats["failed"] += len(todo) - len(fresh)
+
+        return {orig: translations.get(text, orig) for orig, text in prepared.items()}